@@ -0,0 +1,71 @@
+"""Light-weight stand-ins for the BigchainDB transactions.
+
+They only carry what :class:`SmartAssetConsensusRules` reads, so that the
+hot paths can be measured against a :class:`MemoryBigchain` without
+building and signing real transactions.
+"""
+from itertools import count
+
+
+class TransactionLink():
+    def __init__(self, txid, output=0):
+        self.txid = txid
+        self.output = output
+
+
+class Input():
+    def __init__(self, owners_before, fulfills=None):
+        self.owners_before = owners_before
+        self.fulfills = fulfills
+
+
+class Output():
+    def __init__(self, public_keys, amount=1):
+        self.public_keys = public_keys
+        self.amount = amount
+
+
+class Transaction():
+    CREATE = 'CREATE'
+    TRANSFER = 'TRANSFER'
+
+    def __init__(self, id, operation, asset, inputs, outputs, metadata=None):
+        self.id = id
+        self.operation = operation
+        self.asset = asset
+        self.inputs = inputs
+        self.outputs = outputs
+        self.metadata = metadata
+
+    @staticmethod
+    def get_asset_ids(transactions):
+        return list({transaction.id
+                     if transaction.operation == Transaction.CREATE
+                     else transaction.asset['id']
+                     for transaction in transactions})
+
+
+_ids = count()
+
+
+def new_id():
+    return '{:064x}'.format(next(_ids))
+
+
+def create(owner, data=None, metadata=None, outputs=1):
+    return Transaction(new_id(), Transaction.CREATE, {'data': data},
+                       [Input([owner])],
+                       [Output([owner]) for _ in range(outputs)],
+                       metadata)
+
+
+def transfer(input_txs, recipient, metadata=None):
+    asset_id = input_txs[0].id \
+        if input_txs[0].operation == Transaction.CREATE \
+        else input_txs[0].asset['id']
+    return Transaction(new_id(), Transaction.TRANSFER, {'id': asset_id},
+                       [Input(input_tx.outputs[0].public_keys,
+                              TransactionLink(input_tx.id, 0))
+                        for input_tx in input_txs],
+                       [Output([recipient], len(input_txs))],
+                       metadata)
@@ -0,0 +1,226 @@
+"""Benchmarks of the consensus plugin hot paths.
+
+Runs against a :class:`MemoryBigchain` holding the light-weight
+transactions of ``benchmarks.fakes``, so no database is needed::
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --baseline results.json --threshold 0.2
+
+With ``--baseline`` the exit status is 1 if the median time of any
+benchmark grew by more than ``--threshold`` (a fraction) compared to the
+baseline results.
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from time import perf_counter
+
+from benchmarks import fakes
+from bigchaindb_smart_assets.assets import asset_cache
+from bigchaindb_smart_assets.consensus import SmartAssetConsensusRules
+from bigchaindb_smart_assets.memory import MemoryBigchain
+from bigchaindb_smart_assets.policy import (
+    PolicyParser,
+    compile_expression,
+    policy_cache,
+)
+
+BENCHMARKS = []
+
+
+def benchmark(name, number=1):
+    """Register a benchmark.
+
+    The decorated function prepares the data and returns the callable to
+    time, and optionally a setup callable run (untimed) before each round.
+    """
+    def register(prepare):
+        BENCHMARKS.append((name, prepare, number))
+        return prepare
+    return register
+
+
+def expression(size):
+    return ' AND '.join(
+        "transaction.metadata['value'] + {} > 0".format(i)
+        for i in range(size))
+
+
+def policy(size):
+    return [{'condition': "transaction.metadata['state'] == 'S{}'".format(i),
+             'rule': 'LEN(transaction.outputs) == 1'}
+            for i in range(size)]
+
+
+@benchmark('parser_construction')
+def bench_parser_construction():
+    return PolicyParser
+
+
+for _size in (1, 10, 100):
+    @benchmark('policy_compile_eval[{}]'.format(_size))
+    def bench_policy_compile_eval(size=_size):
+        text = expression(size)
+        transaction = fakes.create('alice', metadata={'value': 1})
+        return (lambda: compile_expression(text).evaluate(transaction),
+                policy_cache.clear)
+
+    @benchmark('policy_eval[{}]'.format(_size), number=100)
+    def bench_policy_eval(size=_size):
+        compiled = compile_expression(expression(size))
+        transaction = fakes.create('alice', metadata={'value': 1})
+        return lambda: compiled.evaluate(transaction)
+
+for _size in (10, 1000, 10000):
+    @benchmark('aggregate_outputs[{}]'.format(_size), number=10)
+    def bench_aggregate_outputs(size=_size):
+        compiled = compile_expression(
+            'AMOUNT(transaction.outputs) == {0}'
+            ' AND SUM(transaction.outputs[*].amount) == {0}'
+            ' AND MAX(transaction.outputs[*].amount) == 1'
+            " AND COUNT_IF(transaction.outputs[*].public_keys[*], 'alice')"
+            ' == {0}'.format(size))
+        transaction = fakes.create('alice', outputs=size)
+        return lambda: compiled.evaluate(transaction)
+
+for _size in (10, 1000, 5000):
+    @benchmark('membership[{}]'.format(_size), number=100)
+    def bench_membership(size=_size):
+        keys = ["'key{}'".format(i) for i in range(size)]
+        compiled = compile_expression(
+            'transaction.outputs[0].public_keys[0] IN {{{}}}'
+            .format(', '.join(keys)))
+        transaction = fakes.create('key{}'.format(size - 1))
+        return lambda: compiled.evaluate(transaction)
+
+for _size in (1, 10, 100):
+    @benchmark('validate_policy[{}]'.format(_size), number=100)
+    def bench_validate_policy(size=_size):
+        rules = policy(size)
+        transaction = fakes.create('alice', metadata={'state': 'S0'})
+        return lambda: SmartAssetConsensusRules.validate_policy(
+            rules, transaction)
+
+for _size in (10, 1000, 100000):
+    @benchmark('validate_can_link[{}]'.format(_size))
+    def bench_validate_can_link(size=_size):
+        transactions = []
+        for index in range(size):
+            # the only asset granting the permission is the last one
+            # looked up
+            create = fakes.create(
+                'admin', data={'link': 'target'} if index == size - 1
+                else None)
+            transactions += [create, fakes.transfer([create], 'alice')]
+        bigchain = MemoryBigchain()
+        bigchain.commit_transactions(transactions)
+        return (lambda: SmartAssetConsensusRules.validate_can_link(
+                    bigchain, ['target'], 'alice'),
+                asset_cache.clear)
+
+for _size in (10, 1000):
+    @benchmark('resolve_assets[{}]'.format(_size))
+    def bench_resolve_assets(size=_size):
+        transactions = []
+        input_txs = []
+        for index in range(size):
+            create = fakes.create('alice')
+            input_tx = fakes.transfer([create], 'alice')
+            transactions += [create, input_tx]
+            input_txs.append(input_tx)
+        bigchain = MemoryBigchain()
+        bigchain.commit_transactions(transactions)
+        transaction = fakes.transfer(input_txs, 'bob')
+        input_txs = [(input_, input_tx, bigchain.TX_VALID)
+                     for input_, input_tx
+                     in zip(transaction.inputs, input_txs)]
+        return (lambda: SmartAssetConsensusRules.resolve_assets(
+                    bigchain, transaction, input_txs),
+                asset_cache.clear)
+
+
+def measure(func, setup=None, rounds=5, number=1):
+    # warm up, e.g. the per thread policy parser
+    if setup is not None:
+        setup()
+    func()
+
+    timings = []
+    for _ in range(rounds):
+        if setup is not None:
+            setup()
+        start = perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((perf_counter() - start) / number)
+    return {
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'mean': statistics.mean(timings),
+        'rounds': rounds,
+        'number': number,
+    }
+
+
+def run(selected=None, rounds=5):
+    results = {}
+    for name, prepare, number in BENCHMARKS:
+        if selected and not any(name.startswith(s) for s in selected):
+            continue
+        prepared = prepare()
+        if not isinstance(prepared, tuple):
+            prepared = (prepared, None)
+        func, setup = prepared
+        results[name] = measure(func, setup, rounds, number)
+        print('{:<32} {:>12.6f} s'.format(name, results[name]['median']))
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print the change of every benchmark and return the regressed ones."""
+    regressions = []
+    for name, result in sorted(results.items()):
+        if name not in baseline:
+            continue
+        ratio = result['median'] / baseline[name]['median']
+        regressed = ratio > 1 + threshold
+        if regressed:
+            regressions.append(name)
+        print('{:<32} {:>+8.1%}{}'.format(
+            name, ratio - 1, '  REGRESSION' if regressed else ''))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('benchmarks', nargs='*',
+                        help='only run benchmarks starting with these names')
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--output', help='save the results as JSON')
+    parser.add_argument('--baseline', help='JSON results to compare with')
+    parser.add_argument('--threshold', type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    results = run(args.benchmarks, args.rounds)
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({
+                'python': platform.python_version(),
+                'timestamp': time.time(),
+                'benchmarks': results,
+            }, output, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            baseline = json.load(baseline)['benchmarks']
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
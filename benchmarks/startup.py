@@ -0,0 +1,100 @@
+"""Cold start latency of the consensus plugin.
+
+Every run is a fresh interpreter, timing the import of the plugin and the
+first policy validation, which includes building the policy parser::
+
+    python -m benchmarks.startup --runs 10
+
+The runs import a copy of the package holding its parser tables, the
+``bigchaindb_smart_assets.policy_parsetab`` module generated by
+``python setup.py build``, which a source checkout does not have. With
+``--source`` they import the source tree instead, which generates the
+tables in memory.
+"""
+import argparse
+import compileall
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = '''
+from time import perf_counter
+from benchmarks import fakes
+policy = [{'condition': "transaction.metadata['state'] == 'INIT'",
+           'rule': 'AMOUNT(transaction.outputs) == 1'}]
+transaction = fakes.create('alice', metadata={'state': 'INIT'})
+
+start = perf_counter()
+from bigchaindb_smart_assets.consensus import SmartAssetConsensusRules
+imported = perf_counter()
+SmartAssetConsensusRules.validate_policy(policy, transaction)
+validated = perf_counter()
+import sys
+tables = sys.modules.get('bigchaindb_smart_assets.policy_parsetab')
+print(imported - start, validated - start, int(tables is not None))
+'''
+
+
+def build(directory):
+    """Copy the package into ``directory`` along with its parser tables,
+    byte-compiled as installing it does."""
+    from bigchaindb_smart_assets.policy import write_tables
+
+    package = os.path.join(directory, 'bigchaindb_smart_assets')
+    shutil.copytree(os.path.join(ROOT, 'bigchaindb_smart_assets'), package,
+                    ignore=shutil.ignore_patterns('__pycache__', '*parsetab*',
+                                                  'parser.out'))
+    write_tables(package)
+    compileall.compile_dir(package, quiet=1)
+
+
+def run(runs, source=False):
+    # the working directory comes first on the path of the runs, the
+    # benchmarks package is found through PYTHONPATH
+    path = [ROOT] + [entry for entry in
+                     os.environ.get('PYTHONPATH', '').split(os.pathsep)
+                     if entry]
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(path))
+    imports, firsts, tables = [], [], set()
+    with tempfile.TemporaryDirectory() as directory:
+        if not source:
+            build(directory)
+        for _ in range(runs):
+            output = subprocess.check_output(
+                [sys.executable, '-c', SCRIPT], env=env,
+                cwd=ROOT if source else directory)
+            imported, validated, loaded = output.split()
+            imports.append(float(imported))
+            firsts.append(float(validated))
+            tables.add(loaded == b'1')
+    if tables != {not source}:
+        raise RuntimeError('The parser tables were {}imported'.format(
+            'not ' if not source else ''))
+    return {
+        'import': statistics.median(imports),
+        'first_validation': statistics.median(firsts),
+        'runs': runs,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--source', action='store_true',
+                        help='import the source tree, without parser tables')
+    args = parser.parse_args(argv)
+
+    results = run(args.runs, args.source)
+    print('{:<32} {:>12.6f} s'.format('import', results['import']))
+    print('{:<32} {:>12.6f} s'.format('import_to_first_validation',
+                                      results['first_validation']))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,56 @@
+from bigchaindb_smart_assets.cache import LRUCache
+from bigchaindb_smart_assets.config import config
+from bigchaindb_smart_assets.constants import ASSET_RULE_POLICY
+from bigchaindb_smart_assets.policy import check_policy, compile_policy
+
+
+class AssetDefinition():
+    """The asset of a CREATE transaction, with its policy compiled once."""
+
+    def __init__(self, asset, asset_id=None):
+        self.asset = asset
+        # the id of the CREATE transaction
+        self.asset_id = asset_id
+        self._policy = None
+
+    @property
+    def data(self):
+        return self.asset.get('data') if self.asset else None
+
+    def has_policy(self):
+        return bool(self.data) and ASSET_RULE_POLICY in self.data
+
+    def policy(self):
+        """The compiled policy, see :func:`compile_policy`."""
+        if self._policy is None:
+            self._policy = compile_policy(self.data[ASSET_RULE_POLICY])
+        return self._policy
+
+    def check_policy(self):
+        """Statically check the policy, see :func:`check_policy`."""
+        self._policy = check_policy(self.data[ASSET_RULE_POLICY])
+
+
+# CREATE transactions never change, so their assets are cached across
+# validations and only invalidated when the block holding them is rolled
+# back
+asset_cache = LRUCache(maxsize=config['asset_cache_size'])
+
+
+def get_asset_definition(bigchain, asset_id):
+    """Return the :class:`AssetDefinition` of the asset ``asset_id``, or
+    ``None`` if its CREATE transaction cannot be found."""
+    definition = asset_cache.get(asset_id)
+    if definition is None:
+        transaction = bigchain.get_transaction(asset_id)
+        if transaction is None:
+            return None
+        definition = AssetDefinition(transaction.asset, asset_id)
+        asset_cache.put(asset_id, definition)
+    return definition
+
+
+def invalidate_block(block):
+    """Drop the assets created in ``block`` from the cache."""
+    for transaction in block.transactions:
+        asset_cache.invalidate(transaction.id)
@@ -0,0 +1,93 @@
+"""asyncio entry point of the consensus rules.
+
+The lookups a validation depends on are issued concurrently, level by
+level of their dependency graph (the input transactions and link target,
+then the assets and ``can_link`` entries they name, then the wallet of the
+linking owner, see :meth:`SmartAssetConsensusRules.dependencies`), through
+an :class:`AsyncBackend`. The validation itself
+then runs against the looked up transactions, on an executor thread::
+
+    backend = AsyncBackend(Bigchain())
+    results = await validate_transactions(backend, block.transactions)
+
+A validation thus waits on as many round-trips as there are levels, not as
+many as there are lookups.
+"""
+import asyncio
+from functools import partial
+
+from bigchaindb_smart_assets.consensus import SmartAssetConsensusRules
+from bigchaindb_smart_assets.lookup import LookupContext
+
+
+class AsyncBackend():
+    """Asynchronous view of a ``Bigchain`` instance.
+
+    Lookups of synchronous backends run on the threads of ``executor``
+    (the default executor of the event loop if ``None``). Backends with a
+    native asyncio driver override :meth:`get_transaction` and
+    :meth:`get_owned_ids`; ``bigchain`` still serves the rest of the
+    validation, which is synchronous.
+    """
+
+    def __init__(self, bigchain, executor=None):
+        self.bigchain = bigchain
+        self.executor = executor
+
+    def run(self, func, *args, **kwargs):
+        """Run ``func`` on the executor, returning an awaitable."""
+        return asyncio.get_running_loop().run_in_executor(
+            self.executor, partial(func, *args, **kwargs))
+
+    async def get_transaction(self, transaction_id):
+        """Return a ``(transaction, status)`` tuple, ``(None, None)`` if
+        ``transaction_id`` does not resolve."""
+        result = await self.run(self.bigchain.get_transaction,
+                                transaction_id, include_status=True)
+        return result or (None, None)
+
+    async def get_owned_ids(self, public_key):
+        return await self.run(self.bigchain.get_owned_ids, public_key)
+
+
+async def prefetch(backend, context, transactions):
+    """Look up the dependencies of ``transactions`` into ``context``, the
+    lookups of every level of
+    :meth:`SmartAssetConsensusRules.dependencies` being issued
+    concurrently."""
+    for transaction_ids, public_keys in SmartAssetConsensusRules\
+            .dependencies(context, transactions):
+        found, wallets = await asyncio.gather(
+            asyncio.gather(*[backend.get_transaction(transaction_id)
+                             for transaction_id in transaction_ids]),
+            asyncio.gather(*[backend.get_owned_ids(public_key)
+                             for public_key in public_keys]))
+        context.record_transactions(zip(transaction_ids, found))
+        for public_key, owned_ids in zip(public_keys, wallets):
+            context.record_owned_ids(public_key, owned_ids)
+
+
+async def validate_transaction(backend, transaction):
+    """Asynchronous :meth:`SmartAssetConsensusRules.validate_transaction`,
+    taking an :class:`AsyncBackend`."""
+    context = LookupContext(backend.bigchain)
+    await prefetch(backend, context, [transaction])
+    return await backend.run(
+        SmartAssetConsensusRules.validate_transaction, context, transaction)
+
+
+async def validate_transactions(backend, transactions):
+    """Asynchronous :meth:`SmartAssetConsensusRules.validate_transactions`,
+    the transactions being validated concurrently.
+
+    Returns a list with a ``(result, error)`` tuple per transaction, in
+    order, see :meth:`SmartAssetConsensusRules.validation_result`.
+    """
+    async def validate(transaction):
+        context = LookupContext(backend.bigchain)
+        await prefetch(backend, context, [transaction])
+        return await backend.run(
+            SmartAssetConsensusRules.validation_result, context, transaction)
+
+    return await asyncio.gather(
+        *[validate(transaction) for transaction in transactions])
@@ -0,0 +1,60 @@
+import hashlib
+import math
+
+
+class BloomFilter():
+    """Set of strings answering membership with false positives only.
+
+    Sized for ``capacity`` items at a false positive rate of
+    ``error_rate``: the rate grows past it once more items are added, see
+    :meth:`stats`.
+    """
+
+    def __init__(self, capacity, error_rate):
+        if capacity < 1:
+            raise ValueError('capacity must be >= 1')
+        if not 0 < error_rate < 1:
+            raise ValueError('error_rate must be between 0 and 1')
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = int(math.ceil(
+            -capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _indexes(self, item):
+        # double hashing: the k indexes are a + i * b, from one digest
+        digest = hashlib.sha256(item.encode()).digest()
+        a = int.from_bytes(digest[:8], 'little')
+        b = int.from_bytes(digest[8:16], 'little') | 1
+        return ((a + i * b) % self.size for i in range(self.hashes))
+
+    def add(self, item):
+        for index in self._indexes(item):
+            self.bits[index >> 3] |= 1 << (index & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        bits = self.bits
+        return all(bits[index >> 3] & (1 << (index & 7))
+                   for index in self._indexes(item))
+
+    def __len__(self):
+        return self.count
+
+    def false_positive_rate(self):
+        """The expected false positive rate at the current item count."""
+        return (1 - math.exp(-self.hashes * self.count / self.size)) \
+            ** self.hashes
+
+    def stats(self):
+        return {
+            'capacity': self.capacity,
+            'error_rate': self.error_rate,
+            'items': self.count,
+            'bits': self.size,
+            'hashes': self.hashes,
+            'memory_bytes': len(self.bits),
+            'false_positive_rate': self.false_positive_rate(),
+        }
@@ -0,0 +1,47 @@
+import os
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def _env_list(name, default):
+    return [item.strip() for item in os.environ.get(name, default).split(',')
+            if item.strip()]
+
+
+# Plugin settings, overridable from the environment in the same way
+# BigchainDB reads ``BIGCHAINDB_*`` variables.
+config = {
+    # maximum number of compiled policy expressions kept per process
+    'policy_cache_size': _env_int(
+        'BIGCHAINDB_SMART_ASSETS_POLICY_CACHE_SIZE', 4096),
+    # maximum number of CREATE assets (with their compiled policy) cached
+    'asset_cache_size': _env_int(
+        'BIGCHAINDB_SMART_ASSETS_ASSET_CACHE_SIZE', 10000),
+    # limits on the policies of untrusted assets: the size of an
+    # expression's syntax tree, the number of items of a policy, the length
+    # of the lists aggregated and the evaluation steps of a whole policy
+    'policy_max_nodes': _env_int(
+        'BIGCHAINDB_SMART_ASSETS_POLICY_MAX_NODES', 500),
+    'policy_max_rules': _env_int(
+        'BIGCHAINDB_SMART_ASSETS_POLICY_MAX_RULES', 100),
+    'policy_max_list_length': _env_int(
+        'BIGCHAINDB_SMART_ASSETS_POLICY_MAX_LIST_LENGTH', 10000),
+    'policy_max_steps': _env_int(
+        'BIGCHAINDB_SMART_ASSETS_POLICY_MAX_STEPS', 100000),
+    # metadata keys holding the lifecycle state of an asset, projected by
+    # the AssetStateIndex
+    'state_keys': _env_list(
+        'BIGCHAINDB_SMART_ASSETS_STATE_KEYS', 'state'),
+    # number of transactions validated by validate_stream while the
+    # dependencies of the next ones are fetched
+    'stream_window': _env_int(
+        'BIGCHAINDB_SMART_ASSETS_STREAM_WINDOW', 100),
+    # sizing of the TransactionIdFilter: the number of written
+    # transactions and the false positive rate at that number
+    'txid_filter_capacity': _env_int(
+        'BIGCHAINDB_SMART_ASSETS_TXID_FILTER_CAPACITY', 1000000),
+    'txid_filter_error_rate': float(os.environ.get(
+        'BIGCHAINDB_SMART_ASSETS_TXID_FILTER_ERROR_RATE', 0.001)),
+}
@@ -1,49 +1,411 @@
 import logging
-from bigchaindb.common.exceptions import ValidationError
+from collections import OrderedDict
+from bigchaindb.common.exceptions import BigchainDBError, ValidationError
 from bigchaindb.consensus import BaseConsensusRules
 from bigchaindb.models import Transaction
-from bigchaindb_smart_assets.policy import PolicyParser
-
-ASSET_RULE_POLICY = 'policy'
-ASSET_RULE_ROLE = 'role'
-ASSET_RULE_LINK = 'link'
-METADATA_RULE_CAN_LINK = 'can_link'
+from bigchaindb_smart_assets.assets import (
+    AssetDefinition,
+    asset_cache,
+    get_asset_definition,
+    invalidate_block,
+)
+# ASSET_RULE_POLICY and ASSET_RULE_ROLE are unused, but still importable
+# from this module where they used to be defined
+from bigchaindb_smart_assets.constants import (  # noqa: F401
+    ASSET_RULE_LINK,
+    ASSET_RULE_POLICY,
+    ASSET_RULE_ROLE,
+    METADATA_RULE_CAN_LINK,
+)
+from bigchaindb_smart_assets.expression import (
+    EvaluationContext,
+    LimitExceeded,
+)
+from bigchaindb_smart_assets.index import asset_id, asset_link
+from bigchaindb_smart_assets.lookup import fetch_transactions, lookup_context
+from bigchaindb_smart_assets.metrics import NullMetrics
+from bigchaindb_smart_assets.policy import (
+    PolicyError,
+    compile_policy,
+    policy_cost,
+    policy_references,
+)
+from bigchaindb_smart_assets.tracing import Tracer, event as trace
 
 logger = logging.getLogger(__name__)
 
 class SmartAssetConsensusRules(BaseConsensusRules):
 
+    # Secondary indexes maintained from committed blocks, see commit_block.
+    # They are optional: set them (built with ``rebuild``) to enable them.
+    owner_link_index = None
+    link_target_index = None
+    asset_state_index = None
+    transaction_id_filter = None
+
+    # Validation metrics hook, see bigchaindb_smart_assets.metrics; records
+    # nothing by default.
+    metrics = NullMetrics()
+
+    # Logs one record per validation of the transactions or assets selected
+    # with trace_transaction/trace_asset, or of every transaction when the
+    # logger of this module is enabled for DEBUG.
+    tracer = Tracer(logger)
+
+    @staticmethod
+    def write_transaction(transaction):
+        """Record a transaction written to the backlog.
+
+        To be called for every transaction written to the backlog, by any
+        node, e.g. from the changefeed of the backlog: the lookups of the
+        transactions the ``transaction_id_filter`` misses are not spared.
+        """
+        if SmartAssetConsensusRules.transaction_id_filter is not None:
+            SmartAssetConsensusRules.transaction_id_filter.apply_transaction(
+                transaction)
+
+    @staticmethod
+    def write_block(block):
+        """Record a block written to the chain, before it is voted on.
+
+        To be called for every written block, by any node, e.g. from the
+        changefeed of the chain, see :meth:`write_transaction`.
+        """
+        if SmartAssetConsensusRules.transaction_id_filter is not None:
+            SmartAssetConsensusRules.transaction_id_filter.apply_block(block)
+
+    @staticmethod
+    def commit_block(block):
+        """Apply a committed (i.e. valid) block to the enabled indexes.
+
+        Has to be called for every committed block, in order, for the
+        indexes to stay consistent with the chain.
+        """
+        if SmartAssetConsensusRules.owner_link_index is not None:
+            SmartAssetConsensusRules.owner_link_index.apply_block(block)
+        if SmartAssetConsensusRules.link_target_index is not None:
+            SmartAssetConsensusRules.link_target_index.apply_block(block)
+        if SmartAssetConsensusRules.asset_state_index is not None:
+            SmartAssetConsensusRules.asset_state_index.apply_block(block)
+
+    @staticmethod
+    def rollback_block(block):
+        """Forget what was cached from a block that is no longer part of
+        the chain, e.g. a block voted invalid."""
+        invalidate_block(block)
+
     @staticmethod
     def validate_transaction(bigchain, transaction):
+        # transactions looked up more than once during the validation,
+        # e.g. by the link, asset and can_link checks, are fetched once
+        bigchain = lookup_context(bigchain)
+        metrics = SmartAssetConsensusRules.metrics
+        operation = transaction.operation
+        round_trips = bigchain.round_trips
+        traced = SmartAssetConsensusRules.tracer.begin(transaction)
+        error = None
 
-        input_txs = None
-        if transaction.operation == Transaction.TRANSFER:
-            input_txs = transaction.get_input_txs(bigchain)
+        try:
+            with metrics.timer('validate_transaction', operation):
+                input_txs = None
+                if transaction.operation == Transaction.TRANSFER:
+                    input_txs = transaction.get_input_txs(bigchain)
 
-        result = transaction.validate(bigchain, input_txs)
+                result = transaction.validate(bigchain, input_txs)
 
-        SmartAssetConsensusRules\
-            .validate_asset(bigchain, transaction, input_txs)
+                SmartAssetConsensusRules\
+                    .validate_asset(bigchain, transaction, input_txs)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            metrics.increment('backend_lookups', operation,
+                              bigchain.round_trips - round_trips)
+            if traced is not None:
+                trace('backend_lookups', bigchain.round_trips - round_trips)
+                SmartAssetConsensusRules.tracer.end(traced, error)
 
         return result
 
     @staticmethod
-    def validate_asset(bigchain, transaction, input_txs):
+    def get_linked_assets(target, offset=0, limit=100):
+        """Page through the ids of the assets linking to ``target``.
 
-        SmartAssetConsensusRules.validate_link(transaction, bigchain)
+        Requires the ``link_target_index``, see
+        :meth:`LinkTargetIndex.find`.
+        """
+        if SmartAssetConsensusRules.link_target_index is None:
+            raise RuntimeError('link_target_index is not enabled')
+        return SmartAssetConsensusRules.link_target_index\
+            .find(target, offset, limit)
 
-        assets = SmartAssetConsensusRules \
-            .resolve_assets(bigchain, transaction, input_txs)
+    @staticmethod
+    def get_assets_by_state(value, key=None, offset=0, limit=100):
+        """Page through the ids of the assets whose state ``key`` is
+        ``value``.
+
+        Requires the ``asset_state_index``, see
+        :meth:`AssetStateIndex.find`.
+        """
+        if SmartAssetConsensusRules.asset_state_index is None:
+            raise RuntimeError('asset_state_index is not enabled')
+        return SmartAssetConsensusRules.asset_state_index\
+            .find(value, key, offset, limit)
 
-        for asset in assets:
-            if asset['data'] and ASSET_RULE_POLICY in asset['data']:
-                policy = asset['data']['policy']
-                return SmartAssetConsensusRules\
-                    .validate_policy(policy, transaction)
-            else:
+    @staticmethod
+    def validate_transactions(bigchain, transactions):
+        """Validate a batch of transactions, e.g. the ones of a block.
+
+        The input transactions, link targets, assets and wallets referenced
+        by the batch are fetched up front, one bulk lookup per level of
+        their dependencies, and every transaction is then validated against
+        the prefetched results.
+
+        Returns a list with a ``(result, error)`` tuple per transaction, in
+        order, see :meth:`validation_result`.
+        """
+        transactions = list(transactions)
+        bigchain = SmartAssetConsensusRules\
+            .prefetch(bigchain, transactions)
+
+        return [SmartAssetConsensusRules
+                .validation_result(bigchain, transaction)
+                for transaction in transactions]
+
+    @staticmethod
+    def validation_result(bigchain, transaction):
+        """Validate ``transaction``, returning a ``(result, error)`` tuple:
+        ``result`` is what :meth:`validate_transaction` returned and
+        ``error`` the :class:`ValidationError` it raised, the other one
+        being ``None``.
+
+        Any other error raised by the validation of a malformed
+        transaction, e.g. a ``TypeError``, is returned as a
+        :class:`ValidationError` too, so that it does not fail the other
+        transactions of a batch. Errors of the backend are raised.
+        """
+        try:
+            return SmartAssetConsensusRules\
+                .validate_transaction(bigchain, transaction), None
+        except ValidationError as e:
+            return None, e
+        except BigchainDBError:
+            raise
+        except Exception as e:
+            logger.debug('Unexpected error validating %s',
+                         getattr(transaction, 'id', None), exc_info=True)
+            return None, ValidationError(
+                'Transaction could not be validated: {}: {}'
+                .format(type(e).__name__, e))
+
+    @staticmethod
+    def prefetch(bigchain, transactions):
+        """Return a :class:`LookupContext` holding the dependencies of
+        ``transactions``, see :meth:`dependencies`."""
+        bigchain = lookup_context(bigchain)
+        for transaction_ids, public_keys in SmartAssetConsensusRules\
+                .dependencies(bigchain, transactions):
+            bigchain.prefetch_transactions(transaction_ids)
+            bigchain.prefetch_owned_ids(public_keys)
+        return bigchain
+
+    @staticmethod
+    def dependencies(context, transactions):
+        """Yield the lookups the validation of ``transactions`` depends on,
+        one level of their dependency graph at a time: the input
+        transactions and link targets, then the assets and ``can_link``
+        entries they name, then the wallets of the linking owners, the
+        transactions of these wallets and their assets.
+
+        Every level is a ``(transaction_ids, public_keys)`` tuple of the
+        transactions and wallets to look up, which must be recorded into
+        the :class:`LookupContext` ``context`` before the next level is
+        asked for. :meth:`prefetch` and the asyncio entry point only differ
+        in how they issue the lookups of a level.
+        """
+        def known(transaction_id):
+            if not isinstance(transaction_id, str):
+                return None
+            return context.transactions.get(transaction_id, (None, None))[0]
+
+        def missing(transaction_ids):
+            return list({transaction_id for transaction_id in transaction_ids
+                         if isinstance(transaction_id, str) and
+                         transaction_id not in context.transactions})
+
+        # (input transaction ids, asset id) of the transfers and (public key
+        # of the linking owner, link target) of the links; the dependencies
+        # of malformed transactions are left out, their validation fails
+        # without them, see validation_result
+        transfers = []
+        links = []
+        for transaction in transactions:
+            try:
+                if transaction.operation == Transaction.TRANSFER:
+                    transfers.append(
+                        ([input_.fulfills.txid
+                          for input_ in transaction.inputs],
+                         transaction.asset['id']))
+                link = asset_link(transaction)
+                if link is not None:
+                    public_key = transaction.inputs[0].owners_before[0]
+                    if isinstance(public_key, str):
+                        links.append((public_key, link))
+            except (AttributeError, IndexError, KeyError, TypeError):
+                continue
+        yield missing(
+            [input_id for input_ids, _ in transfers
+             for input_id in input_ids] +
+            [link for _, link in links
+             if SmartAssetConsensusRules.may_exist(link)]), []
+
+        # the assets of the transfers, including the ones of their inputs,
+        # and the first entry of can_link, which tells apart transaction
+        # ids from public keys, see validate_link
+        asset_ids = []
+        for input_ids, transfer_asset_id in transfers:
+            asset_ids.append(transfer_asset_id)
+            for input_id in input_ids:
+                input_tx = known(input_id)
+                if input_tx is not None:
+                    asset_ids.append(asset_id(input_tx))
+        can_links = []
+        for public_key, link in links:
+            metadata = getattr(known(link), 'metadata', None)
+            if isinstance(metadata, dict) and \
+                    METADATA_RULE_CAN_LINK in metadata:
+                can_links.append(
+                    (public_key, metadata[METADATA_RULE_CAN_LINK]))
+        yield missing(
+            [id_ for id_ in asset_ids
+             if isinstance(id_, str) and id_ not in asset_cache] +
+            [can_link[0] for _, can_link in can_links
+             if isinstance(can_link, list) and can_link and
+             SmartAssetConsensusRules.may_exist(can_link[0])]), []
+
+        # the wallets of the owners linking to permission assets, unless the
+        # owner_link_index finds the permission, see validate_can_link
+        owner_link_index = SmartAssetConsensusRules.owner_link_index
+        public_keys = list({
+            public_key for public_key, can_link in can_links
+            if public_key not in context.owned_ids and (
+                isinstance(can_link, str) or
+                isinstance(can_link, list) and can_link and
+                isinstance(can_link[0], str) and
+                known(can_link[0]) is not None) and not (
+                owner_link_index is not None and owner_link_index.holds_any(
+                    public_key,
+                    [can_link] if isinstance(can_link, str) else can_link))})
+        if not public_keys:
+            return
+        yield [], public_keys
+
+        wallet_tx_ids = [output.txid for public_key in public_keys
+                         for output in context.owned_ids[public_key]]
+        yield missing(wallet_tx_ids), []
+        yield missing(
+            [wallet_tx.asset['id']
+             for wallet_tx in map(known, wallet_tx_ids)
+             if wallet_tx is not None and
+             wallet_tx.operation == Transaction.TRANSFER and
+             wallet_tx.asset['id'] not in asset_cache]), []
+
+    @staticmethod
+    def validate_asset(bigchain, transaction, input_txs):
+        metrics = SmartAssetConsensusRules.metrics
+        operation = transaction.operation
+
+        with metrics.timer('validate_link', operation):
+            SmartAssetConsensusRules.validate_link(transaction, bigchain)
+
+        with metrics.timer('resolve_assets', operation):
+            assets = SmartAssetConsensusRules \
+                .resolve_asset_definitions(bigchain, transaction, input_txs)
+
+        if transaction.operation == Transaction.CREATE and \
+                assets[0].has_policy():
+            with metrics.timer('check_policy', operation):
+                SmartAssetConsensusRules.check_asset_policy(assets[0])
+
+        # the policy of every asset is evaluated, and the standard rules
+        # checked once if any asset has no policy
+        policy_assets = [asset for asset in assets if asset.has_policy()]
+        if policy_assets:
+            with metrics.timer('validate_policy', operation):
+                # transaction paths are resolved once for all the policies
+                context = EvaluationContext(transaction)
+                inputs = SmartAssetConsensusRules.reference_inputs(
+                    bigchain, transaction, input_txs, policy_assets)
+                for asset in policy_assets:
+                    context.bind(inputs, asset.asset,
+                                 SmartAssetConsensusRules
+                                 .asset_state(asset, inputs))
+                    SmartAssetConsensusRules.validate_asset_policy(
+                        asset, transaction, context)
+        if len(policy_assets) < len(assets):
+            with metrics.timer('validate_standard', operation):
                 SmartAssetConsensusRules\
                     .validate_standard(bigchain, transaction, input_txs)
 
+        return transaction
+
+    @staticmethod
+    def reference_inputs(bigchain, transaction, input_txs, assets):
+        """Return the transactions spent by the inputs of ``transaction``,
+        for the ``@inputs[<index>]`` and ``@state`` references of the
+        policies of ``assets``.
+
+        The references are listed when the policies are compiled. The
+        input transactions validated along ``transaction`` are used if
+        given, otherwise the referenced ones are fetched in one bulk
+        lookup.
+        """
+        indexes = set()
+        for asset in assets:
+            try:
+                references = policy_references(asset.policy())
+            except PolicyError as e:
+                raise ValidationError(str(e))
+            indexes.update(index for kind, index in references
+                           if kind == 'inputs')
+            if ('state', None) in references:
+                indexes.update(range(len(transaction.inputs)))
+        if not indexes or transaction.operation != Transaction.TRANSFER:
+            return ()
+        if input_txs is not None:
+            return [input_tx for (input_, input_tx, status) in input_txs]
+
+        txids = [input_.fulfills.txid
+                 for index, input_ in enumerate(transaction.inputs)
+                 if index in indexes]
+        found = fetch_transactions(bigchain, txids)
+        return [found[input_.fulfills.txid][0] if index in indexes else None
+                for index, input_ in enumerate(transaction.inputs)]
+
+    @staticmethod
+    def asset_state(asset, inputs):
+        """Return the state of ``asset`` for the ``@state`` references of
+        its policy, ``None`` if it has none.
+
+        The state is the metadata of the transactions of the asset spent
+        by ``inputs`` (see :meth:`reference_inputs`), in the order of the
+        inputs. It only depends on the transaction, so that every node
+        agrees on it whatever indexes it maintains.
+        """
+        try:
+            references = policy_references(asset.policy())
+        except PolicyError as e:
+            raise ValidationError(str(e))
+        if ('state', None) not in references:
+            return None
+        state = {}
+        for input_tx in inputs:
+            if input_tx is not None and \
+                    asset_id(input_tx) == asset.asset_id and \
+                    isinstance(input_tx.metadata, dict):
+                state.update(input_tx.metadata)
+        return state
+
     @staticmethod
     def validate_standard(bigchain, transaction, input_txs):
         if transaction.operation == Transaction.TRANSFER:
@@ -60,36 +422,85 @@ class SmartAssetConsensusRules(BaseConsensusRules):
 
     @staticmethod
     def validate_policy(policy, transaction):
-        if not isinstance(policy, list):
-            raise ValidationError('policy must be a list')
+        try:
+            compiled_policy = compile_policy(policy)
+        except PolicyError as e:
+            raise ValidationError(str(e))
 
-        for policy_rule in policy:
-            if 'condition' not in policy_rule or 'rule' not in policy_rule:
-                raise ValidationError(
-                    'policy item must contain a condition and rule')
+        return SmartAssetConsensusRules\
+            .evaluate_policy(compiled_policy, transaction)
 
-            parser = PolicyParser(transaction)
-            try:
-                if parser.parse(policy_rule['condition']) is True:
-                    if not parser.parse(policy_rule['rule']) is True:
-                        raise ValidationError(
-                            'Rule {} evaluated to false'
-                            .format(policy_rule['rule']))
-
-            except (AttributeError, KeyError) as e:
-                raise ValidationError(
-                    'Wrong policy format: {}'.format(policy_rule))
-            except TypeError as e:
-                pass
+    @staticmethod
+    def validate_asset_policy(asset, transaction, context=None):
+        """Validate ``transaction`` against the policy of an
+        :class:`AssetDefinition`, compiled once per asset."""
+        try:
+            compiled_policy = asset.policy()
+        except PolicyError as e:
+            raise ValidationError(str(e))
 
-        if transaction.operation == Transaction.TRANSFER:
-            pass
+        return SmartAssetConsensusRules\
+            .evaluate_policy(compiled_policy, transaction, context)
+
+    @staticmethod
+    def check_asset_policy(asset):
+        """Reject the CREATE of an asset whose policy would not evaluate
+        cleanly, see :func:`check_policy`."""
+        try:
+            asset.check_policy()
+        except PolicyError as e:
+            raise ValidationError('Invalid policy: {}'.format(e))
+        trace('policy_cost', policy_cost(asset.policy()))
+
+    @staticmethod
+    def evaluate_policy(compiled_policy, transaction, context=None):
+        """Evaluate a compiled policy against ``transaction``.
+
+        ``context`` is the :class:`EvaluationContext` to share with other
+        policies evaluated against the same transaction, if any.
+        """
+        metrics = SmartAssetConsensusRules.metrics
+        # transaction paths are resolved once for the whole policy, and the
+        # whole policy evaluated within one step budget
+        if context is None:
+            context = EvaluationContext(transaction)
+        steps = context.steps
+        try:
+            for policy_rule, condition, rule in compiled_policy:
+                try:
+                    metrics.increment('policy_conditions_evaluated',
+                                      transaction.operation)
+                    if condition.evaluate(transaction, context) is True:
+                        metrics.increment('policy_rules_evaluated',
+                                          transaction.operation)
+                        if not rule.evaluate(transaction, context) is True:
+                            raise ValidationError(
+                                'Rule {} evaluated to false'
+                                .format(policy_rule['rule']))
+
+                except (AttributeError, KeyError) as e:
+                    raise ValidationError(
+                        'Wrong policy format: {}'.format(policy_rule))
+                except (IndexError, ArithmeticError) as e:
+                    # e.g. an output the transaction does not have, or a
+                    # division by zero
+                    raise ValidationError(
+                        'Policy evaluation failed: {}: {}'
+                        .format(policy_rule['rule'], e))
+                except TypeError as e:
+                    pass
+        except LimitExceeded as e:
+            raise ValidationError('Policy limit exceeded: {}'.format(e))
+        finally:
+            metrics.increment('policy_steps', transaction.operation,
+                              context.steps - steps)
+            trace('policy_steps', context.steps - steps)
 
         return transaction
 
     @staticmethod
     def validate_link(transaction, bigchain):
-        logger.info('Validating link')
+        trace('validate_link')
         public_key = transaction.inputs[0].owners_before[0]
 
         # Dont't do anything when it's GENESIS or TRANSFER transaction
@@ -102,18 +513,21 @@ class SmartAssetConsensusRules(BaseConsensusRules):
                                   .format(transaction))
 
         # If link is not being used, don't do anything
-        if transaction.asset['data'] and ASSET_RULE_LINK not in transaction.asset['data']:
+        data = transaction.asset['data']
+        if not isinstance(data, dict) or ASSET_RULE_LINK not in data:
             return
 
         link = transaction.asset['data']['link']
-        logger.info('Link: %s', link)
+        trace('link', link)
+        # not spared by the transaction_id_filter: the link is rejected if
+        # it does not resolve
         tx_to_link = bigchain.get_transaction(link)
 
         if not tx_to_link:
             raise ValidationError('Transaction not resolved to link: {}'
                                   .format(link))
 
-        logger.info('Link Transaction: %s', tx_to_link.id)
+        trace('link_transaction', tx_to_link.id)
 
         if tx_to_link and not hasattr(tx_to_link, 'metadata'):
             raise ValidationError('Metadata not found in transaction {}'
@@ -124,7 +538,7 @@ class SmartAssetConsensusRules(BaseConsensusRules):
                                   .format(tx_to_link))
 
         can_link = tx_to_link.metadata[METADATA_RULE_CAN_LINK]
-        logger.info('Can link: %s', can_link)
+        trace('can_link', can_link)
 
         # can_link validation
         # if can_link is a list
@@ -133,20 +547,28 @@ class SmartAssetConsensusRules(BaseConsensusRules):
         # OR
         # check if the user has a premission asset linked to the can_link asset
         if isinstance(can_link, list):
-            logger.info('can_link is a list')
-            if SmartAssetConsensusRules.check_if_transaction_id(bigchain, can_link[0]):
+            trace('can_link_list')
+            is_tx_id = SmartAssetConsensusRules.check_if_transaction_id(
+                bigchain, can_link[0])
+            if not is_tx_id and public_key not in can_link and \
+                    SmartAssetConsensusRules.transaction_id_filter is not None:
+                # the filter may miss writes: the link is only rejected once
+                # a lookup confirms can_link lists no transaction
+                is_tx_id = SmartAssetConsensusRules.check_if_transaction_id(
+                    bigchain, can_link[0], use_filter=False)
+            if is_tx_id:
                 SmartAssetConsensusRules\
                 .validate_can_link(bigchain, can_link, public_key)
             else:
                 if public_key in can_link:
-                    logger.info('Link valid: public key in can_link')
+                    trace('link_valid', 'public_key')
                     return
                 else:
                     raise ValidationError('Linking is not authorized for: {}'.format(
                         public_key))
         # backward compatibility - if can_link is string then convert it to a list
         elif isinstance(can_link, str):
-            logger.info('can_link is a string')
+            trace('can_link_string')
             can_link_list = [can_link]
             SmartAssetConsensusRules\
             .validate_can_link(bigchain, can_link_list, public_key)
@@ -164,6 +586,13 @@ class SmartAssetConsensusRules(BaseConsensusRules):
 
     @staticmethod
     def resolve_assets(bigchain, transaction, input_txs):
+        return [asset.asset
+                for asset
+                in SmartAssetConsensusRules.resolve_asset_definitions(
+                    bigchain, transaction, input_txs)]
+
+    @staticmethod
+    def resolve_asset_definitions(bigchain, transaction, input_txs):
         if not hasattr(transaction, 'asset'):
             raise ValidationError('Asset not found in transaction {}'
                                   .format(transaction))
@@ -171,36 +600,59 @@ class SmartAssetConsensusRules(BaseConsensusRules):
         if transaction.operation == Transaction.GENESIS:
             return []
         elif transaction.operation == Transaction.CREATE:
-            return [transaction.asset]
+            return [AssetDefinition(transaction.asset, transaction.id)]
         elif transaction.operation == Transaction.TRANSFER:
             asset_ids = transaction.get_asset_ids(
                 [input_tx
                  for (input_, input_tx, status)
                  in input_txs
                  if input_tx is not None])
-            return [bigchain.get_transaction(asset_id).asset
-                    for asset_id
-                    in asset_ids]
+            assets = []
+            # an asset spent by several inputs is validated once
+            for spent_asset_id in OrderedDict.fromkeys(asset_ids):
+                asset = get_asset_definition(bigchain, spent_asset_id)
+                if asset is None:
+                    raise ValidationError('Asset not found: {}'
+                                          .format(spent_asset_id))
+                assets.append(asset)
+            return assets
 
     @staticmethod
     def validate_can_link(bigchain, can_link, public_key):
-        logger.info('validating can_link, looking up assets in owner wallet')
+        # only CREATE transactions link
+        with SmartAssetConsensusRules.metrics.timer('validate_can_link',
+                                                    Transaction.CREATE):
+            SmartAssetConsensusRules\
+                ._validate_can_link(bigchain, can_link, public_key)
+
+    @staticmethod
+    def _validate_can_link(bigchain, can_link, public_key):
+        # the index only knows about committed blocks: it spares the scan
+        # of the wallet when it finds a permission, but the wallet decides
+        # otherwise, so that validity does not depend on the index
+        owner_link_index = SmartAssetConsensusRules.owner_link_index
+        if owner_link_index is not None and \
+                owner_link_index.holds_any(public_key, can_link):
+            trace('link_valid', 'index')
+            return
+
+        trace('validate_can_link', public_key)
         wallet_tx = bigchain.get_owned_ids(public_key)
         wallet_tx_ids = [tx.txid for tx in wallet_tx]
-        logger.info('Wallet has %s assets', len(wallet_tx_ids))
+        trace('wallet_size', len(wallet_tx_ids))
 
-        for asset_id in wallet_tx_ids:
-            logger.info('Looking up asset: %s', asset_id)
-            trans = bigchain.get_transaction(asset_id)
+        for wallet_tx_id in wallet_tx_ids:
+            trace('wallet_asset', wallet_tx_id)
+            trans = bigchain.get_transaction(wallet_tx_id)
             if trans.operation == Transaction.TRANSFER:
-                permission_asset = bigchain.get_transaction(
-                    trans.asset['id']).asset
+                permission_asset = get_asset_definition(
+                    bigchain, trans.asset['id']).asset
             else:
                 permission_asset = trans.asset
             if permission_asset and permission_asset['data'] and\
                     ASSET_RULE_LINK in permission_asset['data']:
                 if permission_asset['data']['link'] in can_link:
-                    logger.info('Link valid: asset.link found in can_link')
+                    trace('link_valid', wallet_tx_id)
                     break
             else:
                 continue
@@ -210,17 +662,35 @@ class SmartAssetConsensusRules(BaseConsensusRules):
         return
 
     @staticmethod
-    def check_if_transaction_id(bigchain, transaction_id):
-        logger.info('Checking if tx id: {}'.format(transaction_id))
+    def may_exist(transaction_id):
+        """Whether ``transaction_id`` may be the id of a known transaction,
+        ``False`` only if the ``transaction_id_filter`` tells it is not,
+        without a backend lookup.
+
+        The filter only knows about the writes it was fed, so ``False``
+        only spares lookups whose outcome cannot reject a transaction:
+        prefetching, or telling apart the public keys of a ``can_link``
+        list that authorize the link.
+        """
+        transaction_id_filter = SmartAssetConsensusRules.transaction_id_filter
+        return transaction_id_filter is None or \
+            transaction_id_filter.might_contain(transaction_id)
+
+    @staticmethod
+    def check_if_transaction_id(bigchain, transaction_id, use_filter=True):
+        if use_filter and \
+                not SmartAssetConsensusRules.may_exist(transaction_id):
+            trace('tx_id_check', transaction_id, False)
+            return False
         is_tx_id = True
         try:
             tx = bigchain.get_transaction(transaction_id)
             if tx:
-                logger.info('Tx id check passed for: {}'.format(transaction_id))
+                trace('tx_id_check', transaction_id, True)
             else:
-                logger.info('Tx id check failed for: {}'.format(transaction_id))
+                trace('tx_id_check', transaction_id, False)
                 is_tx_id = False
         except:
-            logger.info('Tx id check failed for: {}'.format(transaction_id))
+            trace('tx_id_check', transaction_id, False)
             is_tx_id = False
         return is_tx_id
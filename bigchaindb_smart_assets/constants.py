@@ -0,0 +1,4 @@
+ASSET_RULE_POLICY = 'policy'
+ASSET_RULE_ROLE = 'role'
+ASSET_RULE_LINK = 'link'
+METADATA_RULE_CAN_LINK = 'can_link'
@@ -0,0 +1,623 @@
+import operator
+import re
+from array import array
+from itertools import chain
+
+from bigchaindb_smart_assets.config import config
+
+
+class LimitExceeded(ValueError):
+    """Raised when an evaluation exceeds its step budget or list length
+    limit."""
+
+
+class EvaluationContext():
+    """Binds a transaction to the evaluation of one or more expressions.
+
+    Resolved transaction paths are memoized, so a context should be shared
+    by all the expressions of a policy evaluated against one transaction.
+
+    The context also holds the step budget of the evaluation: every
+    expression evaluated is charged its number of nodes, and every list
+    built its number of items. Both only depend on the expressions and the
+    transaction, so a budget is exceeded on every node alike.
+    """
+
+    def __init__(self, transaction, max_steps=None, max_list_length=None):
+        self.transaction = transaction
+        self.values = {}
+        # what @inputs[<index>], @asset and @state references resolve to,
+        # see bind
+        self.inputs = ()
+        self.asset = None
+        self.state = None
+        self.references = {}
+        self.steps = 0
+        self.max_steps = config['policy_max_steps'] \
+            if max_steps is None else max_steps
+        self.max_list_length = config['policy_max_list_length'] \
+            if max_list_length is None else max_list_length
+
+    def charge(self, steps):
+        self.steps += steps
+        if self.steps > self.max_steps:
+            raise LimitExceeded('evaluation exceeded {} steps'
+                                .format(self.max_steps))
+
+    def charge_list(self, values):
+        if len(values) > self.max_list_length:
+            raise LimitExceeded('list of {} items exceeds the maximum of {}'
+                                .format(len(values), self.max_list_length))
+        self.charge(len(values))
+
+    def resolve(self, path):
+        try:
+            return self.values[path.path]
+        except KeyError:
+            value = self.values[path.path] = path.resolve(self.transaction)
+            return value
+
+    def bind(self, inputs, asset, state=None):
+        """Bind the references to the transactions spent by the inputs of
+        the transaction, to the asset whose policy is evaluated (the
+        ``asset`` dict of its CREATE transaction) and to its state.
+
+        The policy of every asset has a step budget of its own, while the
+        transaction paths resolved so far stay memoized.
+        """
+        self.inputs = inputs
+        self.asset = asset
+        self.state = state
+        self.steps = 0
+        self.references = {}
+
+    def resolve_reference(self, reference):
+        try:
+            return self.references[reference.path]
+        except KeyError:
+            pass
+        target = None
+        if reference.target is not None:
+            kind, index = reference.target
+            if kind == 'asset':
+                target = self.asset
+            elif kind == 'state':
+                target = self.state
+            elif index < len(self.inputs):
+                target = self.inputs[index]
+        # like transaction paths, unresolved references evaluate to their
+        # source text
+        value = reference.path if target is None \
+            else reference.resolve(target)
+        self.references[reference.path] = value
+        return value
+
+
+TRANSACTION = 'transaction'
+
+# the attributes of a transaction a path can start with
+TRANSACTION_ATTRIBUTES = frozenset(
+    ('id', 'version', 'operation', 'asset', 'inputs', 'outputs', 'metadata'))
+
+_PATH_STEP = re.compile(
+    r'\.(?P<attribute>[a-zA-Z_][a-zA-Z_0-9]*)'
+    r'|\[(?P<index>\d+)\]'
+    r'|\[(?P<all>\*)\]'
+    r'|\[(?P<quote>[\'"])(?P<key>[a-zA-Z_0-9]*)(?P=quote)\]')
+
+
+def parse_path(path, root=TRANSACTION):
+    """Split a ``transaction.<path>`` into its attribute and item steps.
+
+    Returns a tuple of ``('attribute', name)``, ``('index', int)``,
+    ``('key', str)`` and ``('all', None)`` steps, or ``None`` if ``path`` is
+    not a valid path. Private attributes (starting with ``_``) are never
+    valid. Paths starting with another ``root`` can be split as well.
+    """
+    if not path.startswith(root):
+        return None
+
+    steps = []
+    position = len(root)
+    while position < len(path):
+        match = _PATH_STEP.match(path, position)
+        if match is None:
+            return None
+        if match.group('attribute') is not None:
+            if match.group('attribute').startswith('_'):
+                return None
+            steps.append(('attribute', match.group('attribute')))
+        elif match.group('index') is not None:
+            steps.append(('index', int(match.group('index'))))
+        elif match.group('all') is not None:
+            steps.append(('all', None))
+        else:
+            steps.append(('key', match.group('key')))
+        position = match.end()
+    return tuple(steps)
+
+
+# stands for a value that is only known at evaluation time, e.g. the value
+# of a transaction path
+UNKNOWN = object()
+
+
+def _sample(value):
+    # a small value of the type of value, so that checking an expression
+    # never computes large constants
+    if value is UNKNOWN or isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return 1
+    if isinstance(value, str):
+        return 'a'
+    if isinstance(value, list):
+        return [_sample(item) for item in value]
+    if isinstance(value, frozenset):
+        return frozenset(_sample(item) for item in value)
+    return UNKNOWN
+
+
+def _getter(step):
+    kind, name = step
+    if kind == 'attribute':
+        return operator.attrgetter(name)
+    return operator.itemgetter(name)
+
+
+# sequences a list valued term can evaluate to, see List
+SEQUENCES = (list, array)
+
+
+def column(values):
+    """Store a column of values in an ``array`` if they are integers."""
+    values = list(values)
+    if values and type(values[0]) is int:
+        try:
+            return array('q', values)
+        except (TypeError, OverflowError):
+            pass
+    return values
+
+
+def _getters(steps):
+    # a [*] step projects the steps that follow it over every item of the
+    # value, i.e. they are applied with map rather than attribute access
+    # in Python, and a further [*] flattens the projection
+    getters = []
+    projected = False
+    for step in steps:
+        if step[0] == 'all':
+            getters.append(chain.from_iterable if projected else list)
+            projected = True
+        elif projected:
+            getters.append(lambda values, getter=_getter(step):
+                           list(map(getter, values)))
+        else:
+            getters.append(_getter(step))
+    if projected:
+        getters.append(column)
+    return tuple(getters)
+
+
+class Node():
+    __slots__ = ()
+
+    def evaluate(self, context):
+        raise NotImplementedError
+
+    def children(self):
+        for name in self.__slots__:
+            value = getattr(self, name)
+            if isinstance(value, Node):
+                yield value
+            elif isinstance(value, tuple):
+                for item in value:
+                    if isinstance(item, Node):
+                        yield item
+
+    def check(self):
+        """Type-check the expression without evaluating it.
+
+        Returns a sample value of the type the expression evaluates to, or
+        ``UNKNOWN``. Raises ``TypeError`` (or ``ValueError``) if evaluating
+        the expression would fail whatever the transaction.
+        """
+        raise NotImplementedError
+
+    def __eq__(self, other):
+        return type(self) is type(other) and \
+            all(getattr(self, name) == getattr(other, name)
+                for name in self.__slots__)
+
+    def __hash__(self):
+        return hash((type(self),) +
+                    tuple(getattr(self, name) for name in self.__slots__))
+
+    def __repr__(self):
+        return '{}({})'.format(
+            type(self).__name__,
+            ', '.join(repr(getattr(self, name)) for name in self.__slots__))
+
+
+class Constant(Node):
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def evaluate(self, context):
+        return self.value
+
+    def check(self):
+        return _sample(self.value)
+
+
+class TransactionPath(Node):
+    """A ``transaction.<path>`` reference, resolved at evaluation time."""
+    __slots__ = ('path', 'steps', 'getters')
+
+    def __init__(self, path):
+        self.path = path
+        self.steps = parse_path(path)
+        self.getters = None
+        if self.steps is not None:
+            self.getters = _getters(self.steps)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.path == other.path
+
+    def __hash__(self):
+        return hash((type(self), self.path))
+
+    def __repr__(self):
+        return 'TransactionPath({!r})'.format(self.path)
+
+    def resolve(self, transaction):
+        # unresolved paths evaluate to their source text, as the lexer
+        # always did
+        if self.getters is None:
+            return self.path
+        value = transaction
+        try:
+            for getter in self.getters:
+                value = getter(value)
+        except (AttributeError, KeyError):
+            return self.path
+        return value
+
+    def evaluate(self, context):
+        return context.resolve(self)
+
+    def check(self):
+        if self.steps is None:
+            raise ValueError('Invalid transaction path {}'.format(self.path))
+        if self.steps and self.steps[0] not in \
+                {('attribute', name) for name in TRANSACTION_ATTRIBUTES}:
+            raise ValueError('Unknown transaction attribute {}'
+                             .format(self.path))
+        return UNKNOWN
+
+
+class Reference(TransactionPath):
+    """An ``@inputs[<index>]<path>``, ``@asset<path>`` or ``@state<path>``
+    reference.
+
+    ``@inputs[<index>]`` is the transaction spent by an input of the
+    transaction, ``@asset`` the asset whose policy is evaluated, a dict
+    like ``transaction.asset``, and ``@state`` its state, the metadata of
+    the transactions of the asset spent by the transaction, see
+    :meth:`EvaluationContext.bind`. The
+    ``target`` of a reference is ``('inputs', <index>)``,
+    ``('asset', None)`` or ``('state', None)``, ``None`` if the reference
+    is not valid.
+    """
+    __slots__ = ('target',)
+
+    def __init__(self, path):
+        self.path = path
+        self.target = self.steps = self.getters = None
+        if path.startswith('@inputs'):
+            steps = parse_path(path, '@inputs')
+            if not steps or steps[0][0] != 'index':
+                return
+            self.target = ('inputs', steps[0][1])
+            self.steps = steps[1:]
+        elif path.startswith('@asset'):
+            self.steps = parse_path(path, '@asset')
+            if self.steps is None:
+                return
+            self.target = ('asset', None)
+        elif path.startswith('@state'):
+            self.steps = parse_path(path, '@state')
+            if self.steps is None:
+                return
+            self.target = ('state', None)
+        else:
+            return
+        self.getters = _getters(self.steps)
+
+    def __repr__(self):
+        return 'Reference({!r})'.format(self.path)
+
+    def resolve(self, target):
+        try:
+            return TransactionPath.resolve(self, target)
+        except TypeError:
+            # e.g. an item of a value that is None: the reference is not
+            # resolved, rather than the rule skipped by evaluate_policy
+            return self.path
+
+    def evaluate(self, context):
+        return context.resolve_reference(self)
+
+    def check(self):
+        if self.target is None:
+            raise ValueError('Invalid reference {}'.format(self.path))
+        # @asset and @state are dicts, their keys are items
+        if self.target[0] != 'inputs' and self.steps and \
+                self.steps[0][0] == 'attribute':
+            raise ValueError('Invalid reference {}, use {}[\'{}\']'.format(
+                self.path, self.path.split('.')[0], self.steps[0][1]))
+        return UNKNOWN
+
+
+class UnaryMinus(Node):
+    __slots__ = ('operand',)
+
+    def __init__(self, operand):
+        self.operand = operand
+
+    def evaluate(self, context):
+        return -self.operand.evaluate(context)
+
+    def check(self):
+        operand = self.operand.check()
+        if operand is UNKNOWN:
+            return UNKNOWN
+        return _sample(-operand)
+
+
+BINARY_OPERATORS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.truediv,
+    '==': operator.eq,
+    '<': operator.lt,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<=': operator.le,
+}
+
+
+class BinaryOperation(Node):
+    __slots__ = ('operator', 'left', 'right')
+
+    def __init__(self, operator, left, right):
+        self.operator = operator
+        self.left = left
+        self.right = right
+
+    def evaluate(self, context):
+        return BINARY_OPERATORS[self.operator](
+            self.left.evaluate(context),
+            self.right.evaluate(context))
+
+    def check(self):
+        left = self.left.check()
+        right = self.right.check()
+        # samples stand for any non-zero number, so a constant divisor is
+        # evaluated for what it is
+        if self.operator == '/' and _numeric_constant(self.right) == 0:
+            raise ValueError('Division by zero')
+        if left is UNKNOWN or right is UNKNOWN:
+            return UNKNOWN
+        return _sample(BINARY_OPERATORS[self.operator](left, right))
+
+
+def _numeric_constant(node):
+    """The value of ``node`` if it is only made of numeric constants,
+    ``UNKNOWN`` otherwise."""
+    for child in walk(node):
+        if isinstance(child, Constant):
+            if not isinstance(child.value, (int, float)):
+                return UNKNOWN
+        elif not isinstance(child, (BinaryOperation, UnaryMinus)):
+            return UNKNOWN
+    try:
+        return node.evaluate(None)
+    except ArithmeticError:
+        return UNKNOWN
+
+
+class BooleanOperation(Node):
+    """``AND``/``OR`` with short-circuit semantics.
+
+    The right operand is only evaluated (and its transaction paths and
+    aggregates resolved) when the left operand does not decide the result.
+    """
+    __slots__ = ('operator', 'left', 'right')
+
+    def __init__(self, operator, left, right):
+        self.operator = operator
+        self.left = left
+        self.right = right
+
+    def evaluate(self, context):
+        left = self.left.evaluate(context)
+        if self.operator == 'AND':
+            if not left:
+                return left
+        elif left:
+            return left
+        return self.right.evaluate(context)
+
+    def check(self):
+        self.left.check()
+        self.right.check()
+        # either operand can be the result
+        return UNKNOWN
+
+
+class Membership(Node):
+    """``IN`` and ``NOT IN``, e.g. against a set of constants, hashed into
+    a ``frozenset`` at compile time."""
+    __slots__ = ('negated', 'item', 'container')
+
+    def __init__(self, negated, item, container):
+        self.negated = negated
+        self.item = item
+        self.container = container
+
+    def evaluate(self, context):
+        container = self.container.evaluate(context)
+        if isinstance(container, SEQUENCES):
+            context.charge_list(container)
+        item = self.item.evaluate(context)
+        try:
+            return (item in container) is not self.negated
+        except TypeError:
+            # an unhashable item, e.g. a list, is in no set of constants;
+            # the TypeError must not reach evaluate_policy, which would
+            # count the rule as passed
+            return self.negated
+
+    def check(self):
+        item = self.item.check()
+        container = self.container.check()
+        if item is UNKNOWN or container is UNKNOWN:
+            return UNKNOWN
+        return (item in container) is not self.negated
+
+
+class Set(Node):
+    """A set literal with items only known at evaluation time."""
+    __slots__ = ('items',)
+
+    def __init__(self, items):
+        self.items = tuple(items)
+
+    def evaluate(self, context):
+        values = []
+        for item in self.items:
+            value = item.evaluate(context)
+            try:
+                hash(value)
+            except TypeError:
+                # like an unhashable item, an unhashable value matches
+                # nothing, see Membership
+                continue
+            values.append(value)
+        return frozenset(values)
+
+    def check(self):
+        items = [item.check() for item in self.items]
+        if UNKNOWN in items:
+            return UNKNOWN
+        return frozenset(items)
+
+
+def _evaluate_items(items, context):
+    # a list valued first term is extended rather than nested,
+    # e.g. LEN(transaction.outputs)
+    values = items[0].evaluate(context)
+    if not isinstance(values, SEQUENCES):
+        values = [values]
+    if len(items) > 1:
+        values = list(values)
+        values.extend(item.evaluate(context) for item in items[1:])
+    context.charge_list(values)
+    return values
+
+
+class List(Node):
+    __slots__ = ('items',)
+
+    def __init__(self, items):
+        self.items = tuple(items)
+
+    def evaluate(self, context):
+        return _evaluate_items(self.items, context)
+
+    def check(self):
+        values = [item.check() for item in self.items]
+        if UNKNOWN in values:
+            return UNKNOWN
+        if not isinstance(values[0], list):
+            values[0] = [values[0]]
+        return values[0] + values[1:]
+
+
+_amount = operator.attrgetter('amount')
+
+AGGREGATES = {
+    'LEN': len,
+    'SUM': sum,
+    'AMOUNT': lambda outputs: sum(map(_amount, outputs)),
+    'MIN': lambda values: min(values, default=None),
+    'MAX': lambda values: max(values, default=None),
+    # the number of distinct values
+    'DISTINCT': lambda values: len(set(values)),
+}
+
+
+class Aggregate(Node):
+    __slots__ = ('function', 'argument')
+
+    def __init__(self, function, argument):
+        self.function = function
+        self.argument = argument
+
+    def evaluate(self, context):
+        if self.function == 'COUNT_IF':
+            # the items of the list equal to its last item
+            items = self.argument.items
+            if len(items) < 2:
+                raise TypeError('COUNT_IF takes a list and a value')
+            return _evaluate_items(items[:-1], context)\
+                .count(items[-1].evaluate(context))
+        return AGGREGATES[self.function](self.argument.evaluate(context))
+
+    def check(self):
+        values = self.argument.check()
+        if self.function == 'COUNT_IF':
+            if len(self.argument.items) < 2:
+                raise TypeError('COUNT_IF takes a list and a value')
+            return 1
+        if self.function == 'AMOUNT':
+            # the outputs of a transaction, the only list of outputs
+            if len(self.argument.items) != 1 or values is not UNKNOWN:
+                raise TypeError('AMOUNT takes a single list of outputs')
+            return UNKNOWN
+        if values is UNKNOWN:
+            return UNKNOWN
+        return _sample(AGGREGATES[self.function](values))
+
+
+def walk(node):
+    """Iterate over the nodes of the syntax tree ``node``."""
+    # iteratively, trees are only bounded by the policy_max_nodes limit
+    # once counted
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(node.children())
+
+
+def count_nodes(node):
+    """The number of nodes of the syntax tree ``node``."""
+    return sum(1 for _ in walk(node))
+
+
+def evaluate(node, transaction, context=None):
+    """Evaluate a compiled expression against ``transaction``.
+
+    ``None`` is the result of an expression that failed to parse.
+    """
+    if node is None:
+        return None
+    if context is None:
+        context = EvaluationContext(transaction)
+    return node.evaluate(context)
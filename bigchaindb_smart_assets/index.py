@@ -0,0 +1,277 @@
+from collections import OrderedDict
+from itertools import islice
+from threading import RLock
+
+from bigchaindb.models import Transaction
+
+from bigchaindb_smart_assets.bloom import BloomFilter
+from bigchaindb_smart_assets.config import config
+from bigchaindb_smart_assets.constants import ASSET_RULE_LINK
+
+
+class BlockIndex():
+    """Base class of the secondary indexes maintained from committed blocks.
+
+    Subclasses implement :meth:`apply_transaction` and :meth:`clear`.
+    Blocks have to be applied in the order they were committed.
+    """
+
+    def __init__(self):
+        self.lock = RLock()
+        self.clear()
+
+    def clear(self):
+        raise NotImplementedError
+
+    def apply_transaction(self, transaction):
+        raise NotImplementedError
+
+    def apply_block(self, block):
+        with self.lock:
+            for transaction in block.transactions:
+                self.apply_transaction(transaction)
+
+    def rebuild(self, blocks):
+        """Rebuild the index from an iterable of committed blocks."""
+        with self.lock:
+            self.clear()
+            for block in blocks:
+                self.apply_block(block)
+
+
+def asset_link(transaction):
+    """The ``link`` target declared by a CREATE transaction, if any."""
+    if transaction.operation != Transaction.CREATE:
+        return None
+    data = transaction.asset.get('data') if transaction.asset else None
+    if not isinstance(data, dict):
+        return None
+    link = data.get(ASSET_RULE_LINK)
+    return link if isinstance(link, str) else None
+
+
+class OwnerLinkIndex(BlockIndex):
+    """Maps an owner public key to the link targets it holds.
+
+    An owner holds a link target for as long as it is one of the public
+    keys of an unspent output of an asset whose CREATE transaction links
+    to that target, which is what ``validate_can_link`` looks for in the
+    owner's wallet. Built from committed blocks only, it is a shortcut for
+    the owners it finds holding a target: the wallets of the others are
+    still scanned.
+    """
+
+    def clear(self):
+        # CREATE id -> link target, for assets that link
+        self.asset_links = {}
+        # (txid, output index) -> (link target, public keys)
+        self.outputs = {}
+        # public key -> {link target: number of outputs held}
+        self.holdings = {}
+
+    def apply_transaction(self, transaction):
+        for input_ in transaction.inputs:
+            if input_.fulfills is None:
+                continue
+            spent = self.outputs.pop(
+                (input_.fulfills.txid, input_.fulfills.output), None)
+            if spent is not None:
+                self._release(*spent)
+
+        if transaction.operation == Transaction.CREATE:
+            link = asset_link(transaction)
+            if link is None:
+                return
+            self.asset_links[transaction.id] = link
+        elif transaction.operation == Transaction.TRANSFER:
+            link = self.asset_links.get(transaction.asset['id'])
+            if link is None:
+                return
+        else:
+            return
+
+        for index, output in enumerate(transaction.outputs):
+            public_keys = tuple(output.public_keys)
+            self.outputs[(transaction.id, index)] = (link, public_keys)
+            for public_key in public_keys:
+                held = self.holdings.setdefault(public_key, {})
+                held[link] = held.get(link, 0) + 1
+
+    def _release(self, link, public_keys):
+        for public_key in public_keys:
+            held = self.holdings[public_key]
+            held[link] -= 1
+            if not held[link]:
+                del held[link]
+                if not held:
+                    del self.holdings[public_key]
+
+    def links(self, public_key):
+        """The set of link targets held by ``public_key``."""
+        with self.lock:
+            return set(self.holdings.get(public_key, ()))
+
+    def holds_any(self, public_key, targets):
+        """Whether ``public_key`` holds any of the link ``targets``."""
+        with self.lock:
+            held = self.holdings.get(public_key)
+            if not held:
+                return False
+            return any(target in held for target in targets
+                       if isinstance(target, str))
+
+
+class LinkTargetIndex(BlockIndex):
+    """Maps a link target to the assets linking to it, in commit order."""
+
+    def clear(self):
+        self.linked_assets = {}
+
+    def apply_transaction(self, transaction):
+        link = asset_link(transaction)
+        if link is not None:
+            self.linked_assets.setdefault(link, []).append(transaction.id)
+
+    def count(self, target):
+        with self.lock:
+            return len(self.linked_assets.get(target, ()))
+
+    def find(self, target, offset=0, limit=100):
+        """One page of the ids of the assets linking to ``target``.
+
+        Returns a tuple ``(asset_ids, next_offset)``, ``next_offset`` being
+        ``None`` on the last page.
+        """
+        if offset < 0 or limit < 1:
+            raise ValueError('offset must be >= 0 and limit >= 1')
+        with self.lock:
+            asset_ids = self.linked_assets.get(target, [])
+            page = asset_ids[offset:offset + limit]
+            next_offset = offset + limit
+            if next_offset >= len(asset_ids):
+                next_offset = None
+        return page, next_offset
+
+
+def asset_id(transaction):
+    """The id of the asset of ``transaction``, i.e. of its CREATE."""
+    if transaction.operation == Transaction.TRANSFER:
+        return transaction.asset['id']
+    return transaction.id
+
+
+class AssetStateIndex(BlockIndex):
+    """Projects the latest lifecycle state of every asset.
+
+    The state of an asset maps each of the metadata ``keys`` (the
+    ``state_keys`` setting by default) to its value in the last committed
+    transaction of the asset that set it.
+    """
+
+    def __init__(self, keys=None):
+        self.keys = tuple(config['state_keys'] if keys is None else keys)
+        super().__init__()
+
+    def clear(self):
+        # asset id -> {key: value}
+        self.states = {}
+        # (key, value) -> asset ids, in the order they entered the state
+        self.assets = {}
+
+    def apply_transaction(self, transaction):
+        metadata = transaction.metadata
+        if not isinstance(metadata, dict):
+            return
+        asset = asset_id(transaction)
+        for key in self.keys:
+            if key not in metadata:
+                continue
+            value = metadata[key]
+            try:
+                hash(value)
+            except TypeError:
+                # only scalar states can be queried
+                continue
+            state = self.states.setdefault(asset, {})
+            if key in state:
+                if state[key] == value:
+                    continue
+                previous = self.assets[(key, state[key])]
+                del previous[asset]
+                if not previous:
+                    del self.assets[(key, state[key])]
+            state[key] = value
+            self.assets.setdefault((key, value), OrderedDict())[asset] = None
+
+    def state(self, asset_id):
+        """The state of the asset ``asset_id``, as a new dict."""
+        with self.lock:
+            return dict(self.states.get(asset_id, ()))
+
+    def count(self, value, key=None):
+        with self.lock:
+            return len(self.assets.get((key or self.keys[0], value), ()))
+
+    def find(self, value, key=None, offset=0, limit=100):
+        """One page of the ids of the assets whose ``key`` (the first of
+        the index keys by default) is ``value``, see
+        :meth:`LinkTargetIndex.find`."""
+        if offset < 0 or limit < 1:
+            raise ValueError('offset must be >= 0 and limit >= 1')
+        with self.lock:
+            asset_ids = self.assets.get((key or self.keys[0], value), {})
+            page = list(islice(asset_ids, offset, offset + limit))
+            next_offset = offset + limit
+            if next_offset >= len(asset_ids):
+                next_offset = None
+        return page, next_offset
+
+
+class TransactionIdFilter(BlockIndex):
+    """Bloom filter over the ids of the known transactions.
+
+    Tells, without a backend lookup, that a string is not the id of a
+    transaction ``get_transaction`` may return; :meth:`might_contain` may
+    answer ``True`` for ids that are not, at the false positive rate of
+    the filter. Ids are never removed: the filter is fed the transactions
+    of every written block, whatever its status, and of the backlog, as
+    they are written. A write it missed makes it answer ``False`` for an
+    existing transaction, so its answers only spare lookups, see
+    :meth:`SmartAssetConsensusRules.may_exist`. ``capacity`` and ``error_rate`` default to the
+    ``txid_filter_capacity`` and ``txid_filter_error_rate`` settings.
+    """
+
+    def __init__(self, capacity=None, error_rate=None):
+        self.capacity = config['txid_filter_capacity'] \
+            if capacity is None else capacity
+        self.error_rate = config['txid_filter_error_rate'] \
+            if error_rate is None else error_rate
+        super().__init__()
+
+    def clear(self):
+        self.filter = BloomFilter(self.capacity, self.error_rate)
+        self.queries = 0
+        # lookups answered by the filter alone
+        self.negatives = 0
+
+    def apply_transaction(self, transaction):
+        self.add(transaction.id)
+
+    def add(self, transaction_id):
+        with self.lock:
+            self.filter.add(transaction_id)
+
+    def might_contain(self, transaction_id):
+        with self.lock:
+            self.queries += 1
+            if isinstance(transaction_id, str) and \
+                    transaction_id in self.filter:
+                return True
+            self.negatives += 1
+            return False
+
+    def stats(self):
+        with self.lock:
+            stats = self.filter.stats()
+            stats.update(queries=self.queries, negatives=self.negatives)
+            return stats
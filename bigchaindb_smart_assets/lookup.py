@@ -0,0 +1,118 @@
+def fetch_transactions(bigchain, transaction_ids):
+    """Look up several transactions at once.
+
+    Returns a dict mapping every id to a ``(transaction, status)`` tuple,
+    ``(None, None)`` for ids that do not resolve. Backends that provide
+    ``get_transactions(transaction_ids, include_status=True)`` are queried
+    once, others once per id.
+    """
+    transaction_ids = list(transaction_ids)
+    if not transaction_ids:
+        return {}
+
+    get_transactions = getattr(bigchain, 'get_transactions', None)
+    if get_transactions is not None:
+        found = get_transactions(transaction_ids, include_status=True)
+    else:
+        found = [bigchain.get_transaction(transaction_id, include_status=True)
+                 for transaction_id in transaction_ids]
+
+    return {transaction_id: result if result is not None else (None, None)
+            for transaction_id, result in zip(transaction_ids, found)}
+
+
+class LookupContext():
+    """Request scoped view of a ``Bigchain`` instance.
+
+    Transaction and owned output lookups are memoized for the lifetime of
+    the context, including lookups that found nothing, so a context must
+    not outlive the validation (or block) it was created for. Lookups can
+    also be fetched in bulk ahead of time with :meth:`prefetch_transactions`
+    and :meth:`prefetch_owned_ids`. Every other attribute is delegated to
+    the wrapped instance.
+    """
+
+    def __init__(self, bigchain):
+        self.bigchain = bigchain
+        self.transactions = {}
+        self.owned_ids = {}
+        # lookups answered by the context, i.e. backend round-trips saved
+        self.hits = 0
+        # backend round-trips made, a bulk lookup counting as one
+        self.round_trips = 0
+
+    def __getattr__(self, name):
+        return getattr(self.bigchain, name)
+
+    def prefetch_transactions(self, transaction_ids):
+        missing = {transaction_id for transaction_id in transaction_ids
+                   if transaction_id not in self.transactions}
+        if not missing:
+            return
+
+        get_transactions = getattr(self.bigchain, 'get_transactions', None)
+        self.round_trips += 1 if get_transactions is not None \
+            else len(missing)
+        self.transactions.update(fetch_transactions(self.bigchain, missing))
+
+    def prefetch_owned_ids(self, public_keys):
+        for public_key in set(public_keys):
+            if public_key not in self.owned_ids:
+                self.round_trips += 1
+                self.owned_ids[public_key] = \
+                    self.bigchain.get_owned_ids(public_key)
+
+    def record_transactions(self, found):
+        """Record transactions looked up elsewhere, e.g. concurrently, from
+        an iterable of ``(transaction_id, (transaction, status))``."""
+        for transaction_id, result in found:
+            self.round_trips += 1
+            self.transactions[transaction_id] = result or (None, None)
+
+    def record_owned_ids(self, public_key, owned_ids):
+        self.round_trips += 1
+        self.owned_ids[public_key] = owned_ids
+
+    def get_transaction(self, transaction_id, include_status=False):
+        try:
+            transaction, status = self.transactions[transaction_id]
+            self.hits += 1
+        except KeyError:
+            self.round_trips += 1
+            transaction, status = self.bigchain.get_transaction(
+                transaction_id, include_status=True) or (None, None)
+            self.transactions[transaction_id] = (transaction, status)
+        except TypeError:
+            # not hashable, hence not a transaction id
+            self.round_trips += 1
+            return self.bigchain.get_transaction(transaction_id,
+                                                 include_status)
+
+        if include_status:
+            return transaction, status
+        return transaction
+
+    def get_owned_ids(self, public_key):
+        try:
+            owned_ids = self.owned_ids[public_key]
+            self.hits += 1
+        except KeyError:
+            self.prefetch_owned_ids([public_key])
+            owned_ids = self.owned_ids[public_key]
+        return owned_ids
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'round_trips': self.round_trips,
+            'transactions': len(self.transactions),
+            'owned_ids': len(self.owned_ids),
+        }
+
+
+def lookup_context(bigchain):
+    """Return ``bigchain`` wrapped in a :class:`LookupContext`, unless it
+    already is one."""
+    if isinstance(bigchain, LookupContext):
+        return bigchain
+    return LookupContext(bigchain)
@@ -0,0 +1,215 @@
+from collections import namedtuple
+from uuid import uuid4
+
+from bigchaindb.common import crypto
+from bigchaindb.common.transaction import TransactionLink
+from bigchaindb.common.utils import gen_timestamp
+from bigchaindb.models import Block
+
+# a block of commit_transactions, neither signed nor hashed
+_Block = namedtuple('_Block', ('id', 'transactions'))
+
+
+class MemoryBigchain():
+    """In-process stand-in for ``bigchaindb.Bigchain``, backed by dicts.
+
+    Implements the subset of the ``Bigchain`` interface used by
+    :class:`SmartAssetConsensusRules` and by the block pipeline helpers of
+    the tests (``create_block``, ``write_block``, ``vote``, ``write_vote``),
+    so that validation throughput can be measured and profiled without a
+    database. There is a single, trusted node: votes are not signed.
+
+    Transactions written to the backlog and blocks written to the chain are
+    handed to the ``write_transaction`` and ``write_block`` hooks of the
+    consensus plugin (if any). When a block is voted valid it is handed to
+    its ``commit_block`` hook, ``rollback_block`` when voted invalid.
+    """
+
+    BLOCK_INVALID = 'invalid'
+    BLOCK_VALID = TX_VALID = 'valid'
+    BLOCK_UNDECIDED = TX_UNDECIDED = 'undecided'
+    TX_IN_BACKLOG = 'backlog'
+
+    def __init__(self, consensus_plugin=None, keypair=None):
+        if keypair is None:
+            keypair = crypto.generate_key_pair()
+        self.me_private, self.me = keypair
+        self.consensus = consensus_plugin
+
+        self.backlog = {}
+        # txid -> (transaction, block id)
+        self.transactions = {}
+        self.blocks = {}
+        self.block_status = {}
+        self.last_voted_block = None
+        # (txid, output) -> spending txid
+        self.spent = {}
+        # public key -> {(txid, output)}, unspent outputs only
+        self.unspent = {}
+
+    # Transactions
+
+    def validate_transaction(self, transaction):
+        return self.consensus.validate_transaction(self, transaction)
+
+    def write_transaction(self, transaction):
+        self.backlog[transaction.id] = transaction
+        if hasattr(self.consensus, 'write_transaction'):
+            self.consensus.write_transaction(transaction)
+
+    def get_transaction(self, txid, include_status=False):
+        # like Bigchain, transactions of invalid blocks are not returned,
+        # unless they are back in the backlog
+        transaction, status = None, None
+        if txid in self.transactions:
+            transaction, block_id = self.transactions[txid]
+            status = self.block_status[block_id]
+            if status == self.BLOCK_INVALID:
+                transaction, status = None, None
+        if transaction is None and txid in self.backlog:
+            transaction, status = self.backlog[txid], self.TX_IN_BACKLOG
+
+        if include_status:
+            return transaction, status
+        return transaction
+
+    def get_transactions(self, txids, include_status=False):
+        return [self.get_transaction(txid, include_status) for txid in txids]
+
+    def get_status(self, txid):
+        return self.get_transaction(txid, include_status=True)[1]
+
+    def is_new_transaction(self, txid, exclude_block_id=None):
+        if txid not in self.transactions:
+            return True
+        block_id = self.transactions[txid][1]
+        return block_id == exclude_block_id or \
+            self.block_status[block_id] == self.BLOCK_INVALID
+
+    def get_spent(self, txid, output):
+        spending_txid = self.spent.get((txid, output))
+        if spending_txid is None:
+            return None
+        return self.get_transaction(spending_txid)
+
+    def get_owned_ids(self, owner):
+        return [TransactionLink(txid, output)
+                for txid, output in sorted(self.unspent.get(owner, ()))]
+
+    def get_outputs_filtered(self, owner, include_spent=True):
+        links = self.get_owned_ids(owner)
+        if include_spent:
+            links.extend(
+                TransactionLink(txid, output)
+                for (txid, output) in self.spent
+                if owner in self._public_keys((txid, output)))
+        return links
+
+    # Blocks
+
+    def create_genesis_block(self):
+        block = Block([], self.me, gen_timestamp(), [self.me])
+        block = block.sign(self.me_private)
+        self.blocks[block.id] = block
+        self.block_status[block.id] = self.BLOCK_VALID
+        self.last_voted_block = block
+        return block
+
+    def create_block(self, validated_transactions):
+        block = Block(validated_transactions, self.me, gen_timestamp(),
+                      [self.me])
+        return block.sign(self.me_private)
+
+    def write_block(self, block):
+        self.blocks[block.id] = block
+        self.block_status[block.id] = self.BLOCK_UNDECIDED
+        for transaction in block.transactions:
+            self.backlog.pop(transaction.id, None)
+            self.transactions[transaction.id] = (transaction, block.id)
+            self._apply(transaction)
+        if hasattr(self.consensus, 'write_block'):
+            self.consensus.write_block(block)
+
+    def commit_transactions(self, transactions):
+        """Write ``transactions`` in a block voted valid, e.g. to set up
+        tests and benchmarks.
+
+        The block is neither signed nor hashed, so the transactions only
+        need the attributes the plugin reads, see ``benchmarks.fakes``.
+        """
+        block = _Block(uuid4().hex, list(transactions))
+        self.write_block(block)
+        self.write_vote(self.vote(block.id, None, True))
+        return block
+
+    def get_block(self, block_id):
+        return self.blocks.get(block_id)
+
+    def get_last_voted_block(self):
+        if self.last_voted_block is None:
+            return self.create_genesis_block()
+        return self.last_voted_block
+
+    def vote(self, block_id, previous_block_id, decision, invalid_reason=None):
+        return {
+            'node_pubkey': self.me,
+            'vote': {
+                'voting_for_block': block_id,
+                'previous_block': previous_block_id,
+                'is_block_valid': decision,
+                'invalid_reason': invalid_reason,
+                'timestamp': gen_timestamp(),
+            },
+        }
+
+    def write_vote(self, vote):
+        block_id = vote['vote']['voting_for_block']
+        block = self.blocks[block_id]
+        self.last_voted_block = block
+
+        if vote['vote']['is_block_valid']:
+            self.block_status[block_id] = self.BLOCK_VALID
+            if hasattr(self.consensus, 'commit_block'):
+                self.consensus.commit_block(block)
+        else:
+            self.block_status[block_id] = self.BLOCK_INVALID
+            for transaction in block.transactions:
+                self._revert(transaction)
+            if hasattr(self.consensus, 'rollback_block'):
+                self.consensus.rollback_block(block)
+
+    # Output indexes
+
+    def _apply(self, transaction):
+        for input_ in transaction.inputs:
+            if input_.fulfills is None:
+                continue
+            spent = (input_.fulfills.txid, input_.fulfills.output)
+            self.spent[spent] = transaction.id
+            for public_key in self._public_keys(spent):
+                self.unspent.get(public_key, set()).discard(spent)
+        for index, output in enumerate(transaction.outputs):
+            for public_key in output.public_keys:
+                self.unspent.setdefault(public_key, set()) \
+                    .add((transaction.id, index))
+
+    def _revert(self, transaction):
+        for index, output in enumerate(transaction.outputs):
+            for public_key in output.public_keys:
+                self.unspent.get(public_key, set()) \
+                    .discard((transaction.id, index))
+        for input_ in transaction.inputs:
+            if input_.fulfills is None:
+                continue
+            spent = (input_.fulfills.txid, input_.fulfills.output)
+            if self.spent.get(spent) != transaction.id:
+                continue
+            del self.spent[spent]
+            for public_key in self._public_keys(spent):
+                self.unspent.setdefault(public_key, set()).add(spent)
+
+    def _public_keys(self, output_link):
+        txid, output = output_link
+        if txid not in self.transactions:
+            return []
+        return self.transactions[txid][0].outputs[output].public_keys
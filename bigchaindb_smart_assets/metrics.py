@@ -0,0 +1,148 @@
+import socket
+from bisect import bisect_left
+from threading import Lock
+from time import perf_counter
+
+PREFIX = 'bigchaindb_smart_assets'
+
+# upper bounds, in seconds, of the latency histogram buckets
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+           0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, float('inf'))
+
+
+class _NullTimer():
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class NullMetrics():
+    """Metrics hook that records nothing, the default."""
+
+    def timer(self, stage, operation):
+        return _NULL_TIMER
+
+    def observe(self, stage, operation, seconds):
+        pass
+
+    def increment(self, name, operation, value=1):
+        pass
+
+
+class _Timer():
+    __slots__ = ('metrics', 'stage', 'operation', 'start')
+
+    def __init__(self, metrics, stage, operation):
+        self.metrics = metrics
+        self.stage = stage
+        self.operation = operation
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.stage, self.operation,
+                             perf_counter() - self.start)
+        return False
+
+
+class Metrics(NullMetrics):
+    """In-process latency histograms and counters.
+
+    Latencies are kept per validation stage and transaction operation,
+    counters per name and operation. :meth:`render_prometheus` exports them
+    in the Prometheus text exposition format.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        # (stage, operation) -> [bucket counts, sum, count]
+        self.histograms = {}
+        # (name, operation) -> value
+        self.counters = {}
+        self._lock = Lock()
+
+    def timer(self, stage, operation):
+        return _Timer(self, stage, operation)
+
+    def observe(self, stage, operation, seconds):
+        with self._lock:
+            histogram = self.histograms.get((stage, operation))
+            if histogram is None:
+                histogram = self.histograms[(stage, operation)] = \
+                    [[0] * len(self.buckets), 0.0, 0]
+            histogram[0][bisect_left(self.buckets, seconds)] += 1
+            histogram[1] += seconds
+            histogram[2] += 1
+
+    def increment(self, name, operation, value=1):
+        with self._lock:
+            key = (name, operation)
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def render_prometheus(self, prefix=PREFIX):
+        lines = []
+        with self._lock:
+            if self.histograms:
+                name = '{}_stage_duration_seconds'.format(prefix)
+                lines.append('# TYPE {} histogram'.format(name))
+            for (stage, operation), (counts, total, count) \
+                    in sorted(self.histograms.items()):
+                labels = 'stage="{}",operation="{}"'.format(stage, operation)
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append('{}_bucket{{{},le="{}"}} {}'.format(
+                        name, labels,
+                        '+Inf' if bound == float('inf') else bound,
+                        cumulative))
+                lines.append('{}_sum{{{}}} {}'.format(name, labels, total))
+                lines.append('{}_count{{{}}} {}'.format(name, labels, count))
+
+            for counter in sorted({name for name, _ in self.counters}):
+                name = '{}_{}_total'.format(prefix, counter)
+                lines.append('# TYPE {} counter'.format(name))
+                for (counter_name, operation), value \
+                        in sorted(self.counters.items()):
+                    if counter_name == counter:
+                        lines.append('{}{{operation="{}"}} {}'.format(
+                            name, operation, value))
+        return '\n'.join(lines) + '\n'
+
+
+class StatsdMetrics(NullMetrics):
+    """Sends every measurement to a StatsD daemon over UDP.
+
+    Metric names are ``<prefix>.<stage>.<operation>`` (timings, in
+    milliseconds) and ``<prefix>.<name>.<operation>`` (counters).
+    """
+
+    def __init__(self, host='localhost', port=8125, prefix=PREFIX):
+        self.address = (host, port)
+        self.prefix = prefix
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def timer(self, stage, operation):
+        return _Timer(self, stage, operation)
+
+    def observe(self, stage, operation, seconds):
+        self._send('{}.{}.{}:{:.3f}|ms'.format(
+            self.prefix, stage, operation, seconds * 1000))
+
+    def increment(self, name, operation, value=1):
+        self._send('{}.{}.{}:{}|c'.format(self.prefix, name, operation, value))
+
+    def _send(self, line):
+        try:
+            self._socket.sendto(line.encode(), self.address)
+        except OSError:
+            # metrics must never break validation
+            pass
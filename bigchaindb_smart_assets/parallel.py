@@ -0,0 +1,165 @@
+"""Validation of transaction batches on a pool of worker processes.
+
+Transactions of the same asset are always validated, in order, by the same
+worker, so that the compiled policies and asset definitions it caches stay
+warm from one batch to the next::
+
+    from bigchaindb import Bigchain
+
+    validator = ParallelValidator(Bigchain, processes=4)
+    results = validator.validate_transactions(block.transactions)
+
+Forked workers start with a copy of the indexes and caches of the process
+that created them, which has to be kept up to date: hand every write, and
+every committed (or rolled back) block, to the methods of
+:class:`ParallelValidator` named after the hooks of
+:class:`SmartAssetConsensusRules` as well.
+"""
+import multiprocessing
+import zlib
+from collections import namedtuple
+
+from bigchaindb.models import Transaction
+
+from bigchaindb_smart_assets.consensus import SmartAssetConsensusRules
+from bigchaindb_smart_assets.index import asset_id
+
+# the bigchain instance of a worker process, see _initialize
+_bigchain = None
+
+
+def _initialize(bigchain_factory):
+    global _bigchain
+    _bigchain = bigchain_factory()
+
+
+def _validate(transactions):
+    transactions = [Transaction.from_dict(transaction)
+                    for transaction in transactions]
+    results = SmartAssetConsensusRules\
+        .validate_transactions(_bigchain, transactions)
+    # the validated transaction is the one of the caller, only send back
+    # whether it is valid
+    return [(result is not None, error) for result, error in results]
+
+
+# what the write_block, commit_block and rollback_block hooks read from a
+# block
+_Block = namedtuple('_Block', ('transactions',))
+
+
+def _block(transactions):
+    return _Block([Transaction.from_dict(transaction)
+                   for transaction in transactions])
+
+
+def _write_transaction(transactions):
+    for transaction in _block(transactions).transactions:
+        SmartAssetConsensusRules.write_transaction(transaction)
+
+
+def _write_block(transactions):
+    SmartAssetConsensusRules.write_block(_block(transactions))
+
+
+def _commit_block(transactions):
+    SmartAssetConsensusRules.commit_block(_block(transactions))
+
+
+def _rollback_block(transactions):
+    SmartAssetConsensusRules.rollback_block(_block(transactions))
+
+
+def partition(transactions, partitions):
+    """Split ``transactions`` in ``partitions`` lists of indexes.
+
+    The transactions of an asset all go, in order, to the same partition,
+    which only depends on the asset id.
+    """
+    indexes = [[] for _ in range(partitions)]
+    for index, transaction in enumerate(transactions):
+        key = zlib.crc32(asset_id(transaction).encode()) % partitions
+        indexes[key].append(index)
+    return indexes
+
+
+class ParallelValidator():
+    """Validates batches of transactions with ``processes`` workers.
+
+    Every worker is a process of its own, holding the ``Bigchain`` instance
+    returned by ``bigchain_factory``, which must be picklable (e.g. the
+    ``Bigchain`` class itself) and connect to the same database as the
+    caller. Results are the ones of
+    :meth:`SmartAssetConsensusRules.validate_transactions`, in the order of
+    the transactions.
+    """
+
+    def __init__(self, bigchain_factory, processes=None):
+        if processes is None:
+            processes = multiprocessing.cpu_count()
+        self.workers = [multiprocessing.Pool(1, _initialize,
+                                             (bigchain_factory,))
+                        for _ in range(processes)]
+
+    def validate_transactions(self, transactions):
+        transactions = list(transactions)
+        partitions = partition(transactions, len(self.workers))
+
+        pending = [
+            (indexes, worker.apply_async(
+                _validate,
+                ([transactions[index].to_dict() for index in indexes],)))
+            for worker, indexes in zip(self.workers, partitions)
+            if indexes]
+
+        results = [None] * len(transactions)
+        for indexes, pending_results in pending:
+            for index, (valid, error) in zip(indexes, pending_results.get()):
+                results[index] = \
+                    (transactions[index] if valid else None, error)
+        return results
+
+    def write_transaction(self, transaction):
+        """Record a transaction written to the backlog in every worker, see
+        :meth:`SmartAssetConsensusRules.write_transaction`."""
+        self._broadcast(_write_transaction, [transaction])
+
+    def write_block(self, block):
+        """Record a written block in every worker, see
+        :meth:`SmartAssetConsensusRules.write_block`."""
+        self._broadcast(_write_block, block.transactions)
+
+    def commit_block(self, block):
+        """Apply a committed block to the indexes of every worker, see
+        :meth:`SmartAssetConsensusRules.commit_block`.
+
+        Workers handle their tasks in order, so the transactions validated
+        after this call see the block.
+        """
+        self._broadcast(_commit_block, block.transactions)
+
+    def rollback_block(self, block):
+        """Forget what every worker cached from a block that is no longer
+        part of the chain, see
+        :meth:`SmartAssetConsensusRules.rollback_block`."""
+        self._broadcast(_rollback_block, block.transactions)
+
+    def _broadcast(self, func, transactions):
+        transactions = [transaction.to_dict()
+                        for transaction in transactions]
+        for pending in [worker.apply_async(func, (transactions,))
+                        for worker in self.workers]:
+            pending.get()
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
+        for worker in self.workers:
+            worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
@@ -1,9 +1,36 @@
+import copy
 import re
 import os
+import sys
+import threading
 
 import ply.lex as lex
 import ply.yacc as yacc
 
+from bigchaindb_smart_assets.cache import LRUCache
+from bigchaindb_smart_assets.config import config
+from bigchaindb_smart_assets.expression import (
+    Aggregate,
+    BinaryOperation,
+    BooleanOperation,
+    Constant,
+    List,
+    EvaluationContext,
+    Membership,
+    Reference,
+    Set,
+    TransactionPath,
+    UnaryMinus,
+    count_nodes,
+    evaluate,
+    walk,
+)
+
+
+# the module holding the LALR tables of the grammar, generated when the
+# package is built, see write_tables
+TABMODULE = 'bigchaindb_smart_assets.policy_parsetab'
+
 
 class PolicyParser():
     reserved = {
@@ -11,7 +38,13 @@ class PolicyParser():
         'OR': 'OR',
         'LEN': 'LEN',
         'SUM': 'SUM',
-        'AMOUNT': 'AMOUNT'
+        'AMOUNT': 'AMOUNT',
+        'MIN': 'MIN',
+        'MAX': 'MAX',
+        'COUNT_IF': 'COUNT_IF',
+        'DISTINCT': 'DISTINCT',
+        'IN': 'IN',
+        'NOT': 'NOT'
     }
 
     # List of token names.   This is always required
@@ -26,6 +59,8 @@ class PolicyParser():
         'RPAREN',
         'LBRACK',
         'RBRACK',
+        'LBRACE',
+        'RBRACE',
         'EQ',
         'LT',
         'LEQ',
@@ -33,6 +68,7 @@ class PolicyParser():
         'GEQ',
         'ID',
         'TX',
+        'REF',
         'STRING'
      ) + tuple(reserved.values())
 
@@ -45,6 +81,8 @@ class PolicyParser():
     t_RPAREN = r'\)'
     t_LBRACK = r'\['
     t_RBRACK = r'\]'
+    t_LBRACE = r'\{'
+    t_RBRACE = r'\}'
     t_EQ = r'=='
     t_LT = r'<'
     t_GT = r'>'
@@ -53,12 +91,16 @@ class PolicyParser():
     t_COMMA = r','
 
     precedence = (
-        ('nonassoc', 'EQ', 'LT', 'GT', 'LEQ', 'GEQ'),  # Nonassociative operators
+        ('nonassoc', 'EQ', 'LT', 'GT', 'LEQ', 'GEQ', 'IN'),  # Nonassociative operators
         ('left', 'PLUS', 'MINUS'),
         ('left', 'TIMES', 'DIVIDE'),
         ('right', 'UMINUS'),
     )
 
+    # lexer and parser shared by the instances of a process, see _build
+    _shared = None
+    _shared_lock = threading.Lock()
+
     # Build the lexer
     def __init__(self, transaction=None, **kwargs):
         self.debug = kwargs.get('debug', 0)
@@ -68,14 +110,45 @@ class PolicyParser():
         except:
             modname = "parser" + "_" + self.__class__.__name__
         self.debugfile = modname + ".dbg"
-        self.tabmodule = modname + "_" + "parsetab"
+        self.tabmodule = TABMODULE
 
         self.transaction = transaction
-        self.lexer = lex.lex(module=self, **kwargs)
-        self.parser = yacc.yacc(module=self,
-                                debug=self.debug,
-                                debugfile=self.debugfile,
-                                tabmodule=self.tabmodule)
+        # syntax errors of the last compiled expression
+        self.errors = []
+        if kwargs:
+            # lexer options or a debug file, the lexer and parser are built
+            # for this instance only
+            self.lexer = lex.lex(module=self, **kwargs)
+            self.parser = yacc.yacc(module=self,
+                                    debug=self.debug,
+                                    debugfile=self.debugfile,
+                                    tabmodule=self.tabmodule,
+                                    write_tables=False)
+        else:
+            # an instance only has a lexer and parser state of its own, the
+            # rules and tables are the ones built once per process
+            lexer, parser = PolicyParser._build()
+            self.lexer = lexer.clone(self)
+            # clone only rebinds the rules of the lexer states, begin
+            # switches to the rebound ones
+            self.lexer.begin('INITIAL')
+            self.parser = copy.copy(parser)
+            self.parser.errorfunc = self.p_error
+
+    @classmethod
+    def _build(cls):
+        with cls._shared_lock:
+            if cls._shared is None:
+                rules = cls.__new__(cls)
+                rules.errors = []
+                # the tables are read from TABMODULE, or generated in
+                # memory if it is missing or out of date, never written
+                cls._shared = (
+                    lex.lex(module=rules),
+                    yacc.yacc(module=rules, debug=False,
+                              tabmodule=TABMODULE, write_tables=False,
+                              errorlog=yacc.NullLogger()))
+            return cls._shared
 
     def input(self, *args, **kwargs):
         return self.lexer.input(*args, **kwargs)
@@ -83,19 +156,27 @@ class PolicyParser():
     def token(self, *args, **kwargs):
         return self.lexer.token(*args, **kwargs)
 
-    def parse(self, *args, **kwargs):
+    def compile(self, *args, **kwargs):
+        """Parse an expression into its syntax tree.
+
+        Syntax errors are recorded in :attr:`errors`, the tree being ``None``
+        or the part of the expression that could be parsed.
+        """
+        self.errors = []
         return self.parser.parse(*args, **kwargs)
 
+    def parse(self, *args, **kwargs):
+        """Parse an expression and evaluate it against the transaction."""
+        return evaluate(self.compile(*args, **kwargs), self.transaction)
+
     def t_TX(self, t):
-        r'transaction.[a-zA-Z_0-9\'\"\[\]\.]*'
-        try:
-            # TODO: improve eval (should be somewhat safeguarded)
-            value = eval('self.' + t.value)
-            t.type = self.reserved.get(t.value, 'TX')  # Check for reserved words
-            t.value = value
-        except (AttributeError, KeyError):
-            # TODO: improve
-            t.lexer.skip(1)
+        r'transaction.(?:\[\*\]|[a-zA-Z_0-9\'\"\[\]\.])*'
+        # the path is resolved when the expression is evaluated, so that a
+        # compiled expression does not depend on a transaction
+        return t
+
+    def t_REF(self, t):
+        r'@(?:\[\*\]|[a-zA-Z_0-9\'\"\[\]\.])*'
         return t
 
     def t_STRING(self, t):
@@ -127,7 +208,7 @@ class PolicyParser():
 
     # Error handling rule
     def t_error(self, t):
-        print("Illegal character '%s'" % t.value[0])
+        self.errors.append("Illegal character '{}'".format(t.value[0]))
         t.lexer.skip(1)
 
     def p_binary_operators(self, p):
@@ -135,14 +216,7 @@ class PolicyParser():
                       | expression MINUS term
            term       : term TIMES factor
                       | term DIVIDE factor"""
-        if p[2] == '+':
-            p[0] = p[1] + p[3]
-        elif p[2] == '-':
-            p[0] = p[1] - p[3]
-        elif p[2] == '*':
-            p[0] = p[1] * p[3]
-        elif p[2] == '/':
-            p[0] = p[1] / p[3]
+        p[0] = BinaryOperation(p[2], p[1], p[3])
 
     def p_comparison(self, p):
         """expression : expression EQ expression
@@ -150,28 +224,24 @@ class PolicyParser():
                       | expression LT expression
                       | expression GEQ expression
                       | expression LEQ expression"""
-        if p[2] == '==':
-            p[0] = p[1] == p[3]
-        elif p[2] == '<':
-            p[0] = p[1] < p[3]
-        elif p[2] == '>':
-            p[0] = p[1] > p[3]
-        elif p[2] == '>=':
-            p[0] = p[1] >= p[3]
-        elif p[2] == '<=':
-            p[0] = p[1] <= p[3]
+        p[0] = BinaryOperation(p[2], p[1], p[3])
+
+    def p_membership(self, p):
+        """expression : expression IN expression
+                      | expression NOT IN expression"""
+        if len(p) == 4:
+            p[0] = Membership(False, p[1], p[3])
+        else:
+            p[0] = Membership(True, p[1], p[4])
 
     def p_boolean(self, p):
         """expression : expression AND expression
                       | expression OR expression"""
-        if p[2] == 'AND':
-            p[0] = p[1] and p[3]
-        elif p[2] == 'OR':
-            p[0] = p[1] or p[3]
+        p[0] = BooleanOperation(p[2], p[1], p[3])
 
     def p_expression_uminus(self, p):
         """expression : MINUS expression %prec UMINUS"""
-        p[0] = -p[2]
+        p[0] = UnaryMinus(p[2])
 
     def p_expression_term(self, p):
         """expression : term"""
@@ -179,27 +249,25 @@ class PolicyParser():
 
     def p_expression_aggregate(self, p):
         """expression : func LPAREN list RPAREN"""
-        if p[1] == 'LEN':
-            p[0] = len(p[3])
-        elif p[1] == 'SUM':
-            p[0] = sum(p[3])
-        elif p[1] == 'AMOUNT':
-            # TODO prechecks
-            p[0] = sum([output.amount for output in p[3]])
-
-    def p_list_term(self, p):
-        """list : term
-                | list COMMA term"""
+        p[0] = Aggregate(p[1], p[3])
+
+    def p_list(self, p):
+        """list : items"""
+        p[0] = List(p[1])
+
+    def p_items_term(self, p):
+        """items : term
+                 | items COMMA term"""
+        # the items are appended to one Python list, the List node is
+        # only built once the whole list is parsed
         if len(p) == 2:
-            if isinstance(p[1], list):
-                p[0] = p[1]
-            else:
-                p[0] = [p[1]]
+            p[0] = [p[1]]
         else:
-            p[0] = p[1] + [p[3]]
+            p[1].append(p[3])
+            p[0] = p[1]
 
-    def p_list(self, p):
-        """list : LBRACK list RBRACK"""
+    def p_items(self, p):
+        """items : LBRACK items RBRACK"""
         p[0] = p[2]
 
     def p_term_factor(self, p):
@@ -209,15 +277,34 @@ class PolicyParser():
     def p_functions(self, p):
         """func : LEN
                 | SUM
-                | AMOUNT"""
+                | AMOUNT
+                | MIN
+                | MAX
+                | COUNT_IF
+                | DISTINCT"""
         p[0] = p[1]
 
     def p_factor(self, p):
         """factor : NUMBER
                   | STRING
-                  | ID
-                  | TX"""
-        p[0] = p[1]
+                  | ID"""
+        p[0] = Constant(p[1])
+
+    def p_factor_set(self, p):
+        """factor : LBRACE items RBRACE"""
+        # a set of constants is hashed once, when it is compiled
+        if all(isinstance(item, Constant) for item in p[2]):
+            p[0] = Constant(frozenset(item.value for item in p[2]))
+        else:
+            p[0] = Set(p[2])
+
+    def p_factor_transaction(self, p):
+        """factor : TX"""
+        p[0] = TransactionPath(p[1])
+
+    def p_factor_reference(self, p):
+        """factor : REF"""
+        p[0] = Reference(p[1])
 
     def p_factor_expr(self, p):
         """factor : LPAREN expression RPAREN"""
@@ -225,4 +312,185 @@ class PolicyParser():
 
     # Error rule for syntax errors
     def p_error(self, p):
-        print("Syntax error in input!")
+        if p is None:
+            self.errors.append('Syntax error at end of input')
+        else:
+            self.errors.append("Syntax error at '{}'".format(p.value))
+
+
+class PolicyError(ValueError):
+    """Raised for a policy that is not well formed."""
+
+
+class CompiledExpression():
+    """A policy expression parsed once into its syntax tree.
+
+    The tree does not depend on a transaction, so it can be shared by every
+    evaluation of the same expression text. Its ``cost`` is the number of
+    nodes of the tree, the steps charged to the evaluation context every
+    time the expression is evaluated.
+    """
+
+    def __init__(self, expression, ast, errors=()):
+        self.expression = expression
+        self.ast = ast
+        self.errors = tuple(errors)
+        self.cost = count_nodes(ast) if ast is not None else 0
+        # the targets of the @ references of the expression, see Reference
+        self.references = frozenset(
+            node.target for node in (walk(ast) if ast is not None else ())
+            if isinstance(node, Reference) and node.target is not None)
+        # whether the expression passed check_expression
+        self.checked = False
+
+    def evaluate(self, transaction, context=None):
+        if context is None:
+            context = EvaluationContext(transaction)
+        context.charge(self.cost)
+        return evaluate(self.ast, transaction, context)
+
+
+_local = threading.local()
+
+policy_cache = LRUCache(maxsize=config['policy_cache_size'])
+
+
+def write_tables(outputdir):
+    """Generate the LALR tables of the grammar as the ``policy_parsetab``
+    module of ``outputdir``, e.g. the package directory of a build."""
+    # yacc only generates the tables when it cannot import them
+    imported = sys.modules.get(TABMODULE)
+    sys.modules[TABMODULE] = None
+    try:
+        yacc.yacc(module=PolicyParser.__new__(PolicyParser), debug=False,
+                  tabmodule=TABMODULE, outputdir=outputdir)
+    finally:
+        if imported is not None:
+            sys.modules[TABMODULE] = imported
+        else:
+            sys.modules.pop(TABMODULE, None)
+
+
+def _get_parser():
+    # the lexer and parser tables are built once per process, the lexer and
+    # parser states once per thread; they are not reentrant, hence the
+    # thread local
+    parser = getattr(_local, 'parser', None)
+    if parser is None:
+        parser = _local.parser = PolicyParser()
+    return parser
+
+
+def _compile(expression):
+    parser = _get_parser()
+    parser.lexer.lineno = 1
+    ast = parser.compile(expression, lexer=parser.lexer)
+    return CompiledExpression(expression, ast, parser.errors)
+
+
+def compile_expression(expression):
+    """Return the cached compiled form of ``expression``."""
+    return policy_cache.get_or_create(expression, _compile)
+
+
+def compile_policy(policy):
+    """Compile the conditions and rules of an asset ``policy``.
+
+    Returns a list of ``(policy_rule, condition, rule)`` tuples, the last
+    two being :class:`CompiledExpression` instances. Raises
+    :class:`PolicyError` if the policy is not a list of items with a
+    condition and a rule. Items whose expressions cannot be compiled at all
+    (e.g. they are not strings) are left out, as they were always skipped
+    at evaluation.
+
+    Raises :class:`PolicyError` as well if the policy has more items than
+    ``policy_max_rules`` or an expression more nodes than
+    ``policy_max_nodes``, see :mod:`bigchaindb_smart_assets.config`.
+    """
+    if not isinstance(policy, list):
+        raise PolicyError('policy must be a list')
+    if len(policy) > config['policy_max_rules']:
+        raise PolicyError('policy has {} items, more than the maximum of {}'
+                          .format(len(policy), config['policy_max_rules']))
+
+    compiled = []
+    for policy_rule in policy:
+        if 'condition' not in policy_rule or 'rule' not in policy_rule:
+            raise PolicyError('policy item must contain a condition and rule')
+        try:
+            condition = compile_expression(policy_rule['condition'])
+            rule = compile_expression(policy_rule['rule'])
+        except TypeError:
+            continue
+        for expression in (condition, rule):
+            if expression.cost > config['policy_max_nodes']:
+                raise PolicyError(
+                    'expression has {} nodes, more than the maximum of {}'
+                    .format(expression.cost, config['policy_max_nodes']))
+        compiled.append((policy_rule, condition, rule))
+    return compiled
+
+
+def policy_references(compiled_policy):
+    """The targets of the ``@`` references of a compiled policy, e.g.
+    ``('inputs', 0)`` and ``('asset', None)``."""
+    references = set()
+    for policy_rule, condition, rule in compiled_policy:
+        references.update(condition.references, rule.references)
+    return references
+
+
+def policy_cost(compiled_policy):
+    """The steps charged to evaluate every condition and rule of a
+    compiled policy, aggregated lists left out."""
+    return sum(condition.cost + rule.cost
+               for policy_rule, condition, rule in compiled_policy)
+
+
+def check_expression(compiled):
+    """Statically check a :class:`CompiledExpression`.
+
+    Raises :class:`PolicyError` if it has syntax errors, invalid
+    transaction paths or operands and arguments of the wrong type, see
+    :meth:`Node.check`. The outcome is kept on the (cached) compiled
+    expression, so an expression is only checked once.
+    """
+    if compiled.checked:
+        return
+    if compiled.errors:
+        raise PolicyError('{}: {}'.format(compiled.errors[0],
+                                          compiled.expression))
+    if compiled.ast is None:
+        raise PolicyError('Empty expression')
+    try:
+        compiled.ast.check()
+    except (TypeError, ValueError) as e:
+        raise PolicyError('{}: {}'.format(e, compiled.expression))
+    compiled.checked = True
+
+
+def check_policy(policy):
+    """Compile and statically check every item of an asset ``policy``.
+
+    Unlike :func:`compile_policy`, which keeps evaluating the policies
+    already on the chain as they always were, any item that would not
+    evaluate cleanly raises :class:`PolicyError`. Returns the compiled
+    policy.
+    """
+    if not isinstance(policy, list):
+        raise PolicyError('policy must be a list')
+
+    for policy_rule in policy:
+        if not isinstance(policy_rule, dict) or \
+                'condition' not in policy_rule or 'rule' not in policy_rule:
+            raise PolicyError('policy item must contain a condition and rule')
+        for part in ('condition', 'rule'):
+            if not isinstance(policy_rule[part], str):
+                raise PolicyError('policy {} must be a string'.format(part))
+
+    # within the size limits before the trees are walked
+    compiled = compile_policy(policy)
+    for policy_rule, condition, rule in compiled:
+        check_expression(condition)
+        check_expression(rule)
+    return compiled
@@ -0,0 +1,68 @@
+"""Streaming validation of an incoming flow of transactions.
+
+Transactions are validated by windows: while a window is validated, the
+input transactions, link targets and assets of the next one are fetched on
+a background thread, so that database round-trips overlap with policy
+evaluation::
+
+    for transaction, (result, error) in validate_stream(bigchain, incoming):
+        ...
+
+At most two windows, with their prefetched dependencies, are held in
+memory at any time.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from bigchaindb_smart_assets.config import config
+from bigchaindb_smart_assets.consensus import SmartAssetConsensusRules
+from bigchaindb_smart_assets.lookup import LookupContext
+
+
+def windows(transactions, size):
+    """Split an iterable of transactions in lists of ``size`` (the last
+    one may be shorter), consuming it lazily."""
+    transactions = iter(transactions)
+    while True:
+        window = list(islice(transactions, size))
+        if not window:
+            return
+        yield window
+
+
+def prefetch(bigchain, window):
+    # every window has a context of its own, as it is filled on the
+    # prefetching thread while the previous one is used by the caller
+    return SmartAssetConsensusRules.prefetch(LookupContext(bigchain), window)
+
+
+def validate_stream(bigchain, transactions, window=None):
+    """Validate ``transactions``, an iterable consumed ``window``
+    transactions (the ``stream_window`` setting by default) at a time.
+
+    Yields a ``(transaction, (result, error))`` tuple per transaction, in
+    order, as :meth:`SmartAssetConsensusRules.validate_transactions`
+    returns them. The next window is read from ``transactions``, and its
+    dependencies prefetched, before the current one is validated; errors
+    of the backend raised while prefetching are raised by the generator.
+    """
+    if window is None:
+        window = config['stream_window']
+    if window < 1:
+        raise ValueError('window must be >= 1')
+
+    batches = windows(transactions, window)
+    with ThreadPoolExecutor(1) as prefetcher:
+        batch = next(batches, None)
+        lookups = prefetcher.submit(prefetch, bigchain, batch) \
+            if batch else None
+        while batch:
+            context = lookups.result()
+            next_batch = next(batches, None)
+            if next_batch:
+                lookups = prefetcher.submit(prefetch, bigchain, next_batch)
+
+            for transaction in batch:
+                yield transaction, SmartAssetConsensusRules\
+                    .validation_result(context, transaction)
+            batch = next_batch
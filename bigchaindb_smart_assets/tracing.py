@@ -0,0 +1,92 @@
+import logging
+import threading
+from time import perf_counter
+
+_local = threading.local()
+
+
+def event(name, *args):
+    """Record an event in the trace of the current validation, if any.
+
+    Nothing is formatted here: events are rendered once, when the trace
+    is emitted, and not at all for validations that are not traced.
+    """
+    trace = getattr(_local, 'trace', None)
+    if trace is not None:
+        trace.events.append((name, args))
+
+
+class Trace():
+    __slots__ = ('transaction', 'events', 'start')
+
+    def __init__(self, transaction):
+        self.transaction = transaction
+        self.events = []
+        self.start = perf_counter()
+
+    def __str__(self):
+        return ' '.join(
+            '{}({})'.format(name, ','.join(str(arg) for arg in args))
+            for name, args in self.events)
+
+
+# the same as bigchaindb_smart_assets.index.asset_id, which this module
+# does not import so that it does not depend on bigchaindb
+def asset_id(transaction):
+    if transaction.operation == 'TRANSFER':
+        return transaction.asset['id']
+    return transaction.id
+
+
+class Tracer():
+    """Traces the validations of selected transactions.
+
+    A traced validation is logged as one record, with the events recorded
+    along the way, when it ends. Transactions are traced if their id or
+    asset id was selected with :meth:`trace_transaction` or
+    :meth:`trace_asset`, or if the logger is enabled for DEBUG.
+    """
+
+    def __init__(self, logger):
+        self.logger = logger
+        self.transaction_ids = set()
+        self.asset_ids = set()
+
+    def trace_transaction(self, transaction_id):
+        self.transaction_ids.add(transaction_id)
+
+    def trace_asset(self, asset_id):
+        self.asset_ids.add(asset_id)
+
+    def clear(self):
+        self.transaction_ids.clear()
+        self.asset_ids.clear()
+
+    def is_traced(self, transaction):
+        if self.logger.isEnabledFor(logging.DEBUG):
+            return True
+        if not self.transaction_ids and not self.asset_ids:
+            return False
+        return transaction.id in self.transaction_ids or \
+            asset_id(transaction) in self.asset_ids
+
+    def begin(self, transaction):
+        """Start tracing the validation of ``transaction``.
+
+        Returns the :class:`Trace`, or ``None`` if the transaction is not
+        traced.
+        """
+        if not self.is_traced(transaction):
+            return None
+        trace = _local.trace = Trace(transaction)
+        return trace
+
+    def end(self, trace, error=None):
+        _local.trace = None
+        self.logger.info(
+            'validated tx=%s operation=%s asset=%s result=%s '
+            'duration_ms=%.3f events=[%s]',
+            trace.transaction.id, trace.transaction.operation,
+            asset_id(trace.transaction),
+            'valid' if error is None else 'invalid({!r})'.format(error),
+            (perf_counter() - trace.start) * 1000, trace)
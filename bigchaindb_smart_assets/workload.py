@@ -0,0 +1,165 @@
+"""Synthetic workloads for load testing the consensus plugin.
+
+Generates CREATE, TRANSFER and linking CREATE transactions, grouped in
+blocks that only depend on earlier blocks, and replays them against a
+bigchain (typically a :class:`MemoryBigchain`)::
+
+    python -m bigchaindb_smart_assets.workload --assets 100000 --transfers 9
+"""
+import argparse
+import random
+import time
+
+from bigchaindb.common import crypto
+from bigchaindb.models import Transaction
+
+from bigchaindb_smart_assets.constants import (
+    ASSET_RULE_LINK,
+    ASSET_RULE_POLICY,
+    METADATA_RULE_CAN_LINK,
+)
+
+STEP_POLICY = [
+    {
+        'condition': "transaction.operation == 'TRANSFER'",
+        'rule': "AMOUNT(transaction.outputs) == 1"
+                " AND transaction.metadata['step'] > 0",
+    },
+]
+
+
+class Workload():
+    """Lazily generated blocks of valid transactions.
+
+    ``assets`` assets are created, ``transfers`` times transferred each.
+    ``policy_ratio`` of them carry a policy and ``link_ratio`` of them link
+    to a permission transaction whose ``can_link`` lists the ``keys``
+    participants. Assets are processed ``block_size`` at a time, so memory
+    use does not grow with the size of the workload.
+
+    ``seed`` only makes the shape of the workload reproducible, i.e. which
+    assets link, carry a policy or change hands between which of the
+    participants: the keypairs are random, so the transaction ids differ
+    from one run to the next.
+    """
+
+    def __init__(self, assets=1000, transfers=9, policy_ratio=0.5,
+                 link_ratio=0.1, keys=100, block_size=1000, seed=None):
+        self.assets = assets
+        self.transfers = transfers
+        self.policy_ratio = policy_ratio
+        self.link_ratio = link_ratio
+        self.block_size = block_size
+        self.random = random.Random(seed)
+        self.keypairs = [crypto.generate_key_pair() for _ in range(keys)]
+        self.admin = crypto.generate_key_pair()
+
+    def __len__(self):
+        return 1 + self.assets * (1 + self.transfers)
+
+    def blocks(self):
+        admin_private, admin_public = self.admin
+        permission = Transaction.create(
+            [admin_public], [([admin_public], 1)],
+            metadata={METADATA_RULE_CAN_LINK: [keypair.public_key
+                                               for keypair in self.keypairs]},
+        ).sign([admin_private])
+        yield [permission]
+
+        for start in range(0, self.assets, self.block_size):
+            count = min(self.block_size, self.assets - start)
+            heads = [self._create(permission) for _ in range(count)]
+            yield [transaction for transaction, keypair in heads]
+
+            for step in range(1, self.transfers + 1):
+                heads = [self._transfer(transaction, keypair, step)
+                         for transaction, keypair in heads]
+                yield [transaction for transaction, keypair in heads]
+
+    def _create(self, permission):
+        keypair = self.random.choice(self.keypairs)
+        draw = self.random.random()
+        if draw < self.link_ratio:
+            data = {ASSET_RULE_LINK: permission.id}
+        elif draw < self.link_ratio + self.policy_ratio:
+            data = {ASSET_RULE_POLICY: STEP_POLICY}
+        else:
+            data = {'nonce': self.random.getrandbits(64)}
+
+        transaction = Transaction.create(
+            [keypair.public_key], [([keypair.public_key], 1)],
+            asset={'data': data},
+        ).sign([keypair.private_key])
+        return transaction, keypair
+
+    def _transfer(self, input_tx, keypair, step):
+        recipient = self.random.choice(self.keypairs)
+        asset_id = input_tx.id \
+            if input_tx.operation == Transaction.CREATE \
+            else input_tx.asset['id']
+
+        transaction = Transaction.transfer(
+            input_tx.to_inputs(),
+            [([recipient.public_key], 1)],
+            asset_id=asset_id,
+            metadata={'step': step},
+        ).sign([keypair.private_key])
+        return transaction, recipient
+
+
+def replay(bigchain, blocks, consensus):
+    """Validate, write and vote every block with ``consensus``.
+
+    Returns a dict with the number of valid and invalid transactions and
+    the time spent validating them.
+    """
+    stats = {'blocks': 0, 'valid': 0, 'invalid': 0, 'validation_time': 0.0}
+    for transactions in blocks:
+        start = time.perf_counter()
+        results = consensus.validate_transactions(bigchain, transactions)
+        stats['validation_time'] += time.perf_counter() - start
+
+        valid = [transaction
+                 for transaction, (result, error) in zip(transactions, results)
+                 if error is None]
+        stats['blocks'] += 1
+        stats['valid'] += len(valid)
+        stats['invalid'] += len(transactions) - len(valid)
+
+        block = bigchain.create_block(valid)
+        bigchain.write_block(block)
+        bigchain.write_vote(bigchain.vote(
+            block.id, bigchain.get_last_voted_block().id, True))
+    return stats
+
+
+def main(argv=None):
+    from bigchaindb_smart_assets.consensus import SmartAssetConsensusRules
+    from bigchaindb_smart_assets.memory import MemoryBigchain
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--assets', type=int, default=1000)
+    parser.add_argument('--transfers', type=int, default=9)
+    parser.add_argument('--policy-ratio', type=float, default=0.5)
+    parser.add_argument('--link-ratio', type=float, default=0.1)
+    parser.add_argument('--keys', type=int, default=100)
+    parser.add_argument('--block-size', type=int, default=1000)
+    parser.add_argument('--seed', type=int,
+                        help='reproduce the shape of the workload, the'
+                             ' keypairs and transaction ids are random')
+    args = parser.parse_args(argv)
+
+    workload = Workload(args.assets, args.transfers, args.policy_ratio,
+                        args.link_ratio, args.keys, args.block_size,
+                        args.seed)
+    bigchain = MemoryBigchain(consensus_plugin=SmartAssetConsensusRules)
+    stats = replay(bigchain, workload.blocks(), SmartAssetConsensusRules)
+
+    print('{blocks} blocks, {valid} valid and {invalid} invalid transactions'
+          .format(**stats))
+    print('{:.0f} transactions/s validated'.format(
+        (stats['valid'] + stats['invalid']) / stats['validation_time']))
+
+
+if __name__ == '__main__':
+    main()
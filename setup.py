@@ -1,7 +1,10 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import os
+
 from setuptools import setup
+from setuptools.command.build_py import build_py as _build_py
 
 # with open('README.rst') as readme_file:
 #     readme = readme_file.read()
@@ -13,6 +16,19 @@ install_requires = [
     'ply'
 ]
 
+
+class build_py(_build_py):
+    """Also generate the LALR tables of the policy grammar, shipped as the
+    ``bigchaindb_smart_assets.policy_parsetab`` module."""
+
+    def run(self):
+        _build_py.run(self)
+        if not self.dry_run:
+            from bigchaindb_smart_assets.policy import write_tables
+            write_tables(os.path.join(self.build_lib,
+                                      'bigchaindb_smart_assets'))
+
+
 tests_require = [
     'tox>=2.3.1',
     'coverage>=4.1',
@@ -60,6 +76,7 @@ setup(
     package_dir={'bigchaindb_smart_assets':
                  'bigchaindb_smart_assets'},
     include_package_data=True,
+    cmdclass={'build_py': build_py},
     install_requires=install_requires,
     license="Apache Software License 2.0",
     zip_safe=False,
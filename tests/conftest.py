@@ -450,3 +450,34 @@ def b():
     from bigchaindb_smart_assets.consensus import SmartAssetConsensusRules
     return Bigchain(consensus_plugin=SmartAssetConsensusRules)
 
+
+@pytest.fixture
+def workload_blocks():
+    """The blocks of a small workload: the permission, the CREATEs (some
+    linking to it), then their TRANSFERs."""
+    from bigchaindb_smart_assets.workload import Workload
+
+    workload = Workload(assets=8, transfers=1, link_ratio=0.5, keys=3,
+                        block_size=8, seed=1)
+    return tuple(workload.blocks())
+
+
+@pytest.fixture
+def workload_bigchain(workload_blocks):
+    """A ``MemoryBigchain`` holding the permission of ``workload_blocks``."""
+    from bigchaindb_smart_assets.consensus import SmartAssetConsensusRules
+    from bigchaindb_smart_assets.memory import MemoryBigchain
+    from bigchaindb_smart_assets.workload import replay
+
+    bigchain = MemoryBigchain(consensus_plugin=SmartAssetConsensusRules)
+    replay(bigchain, workload_blocks[:1], SmartAssetConsensusRules)
+    return bigchain
+
+
+@pytest.fixture
+def summary():
+    """Summarize a list of ``(result, error)`` validation results, for
+    comparing validators."""
+    def summary(results):
+        return [(result is not None, str(error)) for result, error in results]
+    return summary
@@ -0,0 +1,274 @@
+from types import SimpleNamespace
+
+
+def create(asset_id, data, metadata=None):
+    return SimpleNamespace(
+        id=asset_id, operation='CREATE', asset={'data': data},
+        inputs=[SimpleNamespace(owners_before=['alice'], fulfills=None)],
+        outputs=[SimpleNamespace(public_keys=['alice'], amount=1)],
+        metadata=metadata)
+
+
+def memory_bigchain(*transactions):
+    from bigchaindb_smart_assets.memory import MemoryBigchain
+
+    bigchain = MemoryBigchain()
+    bigchain.commit_transactions(transactions)
+    return bigchain
+
+
+def test_asset_definitions_are_cached(monkeypatch):
+    from bigchaindb_smart_assets.assets import (
+        asset_cache, get_asset_definition, invalidate_block)
+
+    policy = [{'condition': '1 == 1', 'rule': '2 == 2'}]
+    asset = create('asset', {'policy': policy})
+    bigchain = memory_bigchain(asset)
+    lookups = []
+    get_transaction = bigchain.get_transaction
+    monkeypatch.setattr(
+        bigchain, 'get_transaction',
+        lambda txid: lookups.append(txid) or get_transaction(txid))
+    asset_cache.clear()
+
+    definition = get_asset_definition(bigchain, 'asset')
+    assert definition.has_policy()
+    assert get_asset_definition(bigchain, 'asset') is definition
+    assert definition.policy() is definition.policy()
+    assert lookups == ['asset']
+
+    invalidate_block(SimpleNamespace(transactions=[asset]))
+    assert get_asset_definition(bigchain, 'asset') is not definition
+    assert lookups == ['asset', 'asset']
+
+
+def test_asset_definition_without_policy():
+    from bigchaindb_smart_assets.assets import AssetDefinition
+
+    assert not AssetDefinition({'data': None}).has_policy()
+    assert not AssetDefinition({'data': {'link': 'abc'}}).has_policy()
+
+
+def test_create_with_invalid_policy_is_rejected():
+    import pytest
+    from bigchaindb.common.exceptions import ValidationError
+    from bigchaindb_smart_assets.assets import AssetDefinition
+    from bigchaindb_smart_assets.consensus import SmartAssetConsensusRules
+
+    valid = AssetDefinition({'data': {'policy': [
+        {'condition': '1 == 1', 'rule': 'LEN(transaction.inputs) == 1'}]}})
+    invalid = AssetDefinition({'data': {'policy': [
+        {'condition': '1 == 1', 'rule': "LEN(transaction.inputs) == 'one' + 1"}]}})
+
+    SmartAssetConsensusRules.check_asset_policy(valid)
+    with pytest.raises(ValidationError) as excinfo:
+        SmartAssetConsensusRules.check_asset_policy(invalid)
+    assert 'Invalid policy' in str(excinfo.value)
+
+
+def test_every_asset_policy_is_evaluated_once():
+    import pytest
+    from bigchaindb.common.exceptions import ValidationError
+    from bigchaindb_smart_assets.assets import asset_cache
+    from bigchaindb_smart_assets.consensus import SmartAssetConsensusRules
+    from bigchaindb_smart_assets.metrics import Metrics
+
+    def asset(asset_id, rule):
+        policy = [{'condition': "transaction.operation == 'TRANSFER'",
+                   'rule': rule}]
+        return create(asset_id, {'policy': policy})
+
+    assets = {'a': asset('a', 'LEN(transaction.outputs) == 1'),
+              'b': asset('b', 'LEN(transaction.outputs) == 2')}
+    bigchain = memory_bigchain(*assets.values())
+    asset_cache.clear()
+    transaction = SimpleNamespace(
+        operation='TRANSFER', asset={'id': 'a'}, outputs=[None],
+        inputs=[SimpleNamespace(owners_before=['alice'])] * 3,
+        get_asset_ids=lambda input_txs: [input_tx.id
+                                         for input_tx in input_txs])
+    input_txs = [(None, assets[asset_id], 'valid')
+                 for asset_id in ('a', 'a', 'b')]
+
+    default_metrics = SmartAssetConsensusRules.metrics
+    metrics = SmartAssetConsensusRules.metrics = Metrics()
+    try:
+        with pytest.raises(ValidationError) as excinfo:
+            SmartAssetConsensusRules.validate_asset(
+                bigchain, transaction, input_txs)
+    finally:
+        SmartAssetConsensusRules.metrics = default_metrics
+
+    assert 'LEN(transaction.outputs) == 2' in str(excinfo.value)
+    assert metrics.counters[('policy_conditions_evaluated', 'TRANSFER')] == 2
+
+
+def test_policy_evaluation_errors_are_validation_errors():
+    import pytest
+    from bigchaindb.common.exceptions import ValidationError
+    from bigchaindb_smart_assets.consensus import SmartAssetConsensusRules
+    from bigchaindb_smart_assets.policy import compile_policy
+
+    transaction = SimpleNamespace(
+        operation='TRANSFER', metadata={'zero': 0},
+        outputs=[SimpleNamespace(amount=1, public_keys=['bob'])])
+    for rule in ('transaction.outputs[1].amount == 1',
+                 "1 / transaction.metadata['zero'] == 1"):
+        policy = compile_policy([{'condition': '1 == 1', 'rule': rule}])
+        with pytest.raises(ValidationError) as excinfo:
+            SmartAssetConsensusRules.evaluate_policy(policy, transaction)
+        assert 'Policy evaluation failed' in str(excinfo.value)
+
+
+def test_unexpected_errors_only_invalidate_their_transaction():
+    import pytest
+    from bigchaindb.common.exceptions import BigchainDBError, ValidationError
+    from bigchaindb_smart_assets.consensus import SmartAssetConsensusRules
+
+    def plain_create(transaction_id, error=None):
+        # a CREATE without asset data, i.e. neither a link nor a policy
+        transaction = create(transaction_id, None)
+
+        def validate(bigchain, input_txs):
+            if error is not None:
+                raise error
+            return transaction
+        transaction.validate = validate
+        return transaction
+
+    bigchain = memory_bigchain()
+    results = SmartAssetConsensusRules.validate_transactions(
+        bigchain, [plain_create('a'), plain_create('b', KeyError('amount')),
+                   plain_create('c')])
+    assert [result.id if result else None for result, _ in results] == \
+        ['a', None, 'c']
+    assert results[0][1] is None and results[2][1] is None
+    assert isinstance(results[1][1], ValidationError)
+    assert "KeyError: 'amount'" in str(results[1][1])
+
+    # nor are the ones of a transaction too malformed to be prefetched
+    malformed = plain_create('e')
+    malformed.asset = {'data': {'link': 'a'}}
+    malformed.inputs = None
+    results = SmartAssetConsensusRules.validate_transactions(
+        bigchain, [malformed, plain_create('f')])
+    assert isinstance(results[0][1], ValidationError)
+    assert results[1][0].id == 'f'
+
+    # errors of the backend are not the transaction's
+    with pytest.raises(BigchainDBError):
+        SmartAssetConsensusRules.validate_transactions(
+            bigchain, [plain_create('d', BigchainDBError('unreachable'))])
+
+
+def test_unhashable_values_are_not_members():
+    import pytest
+    from bigchaindb.common.exceptions import ValidationError
+    from bigchaindb_smart_assets.consensus import SmartAssetConsensusRules
+    from bigchaindb_smart_assets.policy import compile_policy
+
+    def evaluate(rule, approver):
+        policy = compile_policy([{'condition': '1 == 1', 'rule': rule}])
+        transaction = SimpleNamespace(operation='TRANSFER',
+                                      metadata={'approver': approver})
+        return SmartAssetConsensusRules.evaluate_policy(policy, transaction)
+
+    member = "transaction.metadata['approver'] IN {}"
+    # the set of constants is hashed at compile time, the other one when
+    # evaluated
+    for container in ("{'alice', 'bob'}",
+                      "{'alice', transaction.metadata['approver']}"):
+        for approver in (['mallory'], {'name': 'alice'}):
+            with pytest.raises(ValidationError):
+                evaluate(member.format(container), approver)
+        evaluate(member.format(container), 'alice')
+    evaluate("transaction.metadata['approver'] NOT IN {'alice', 'bob'}",
+             ['alice'])
+
+
+def test_every_asset_policy_has_its_own_step_budget(monkeypatch):
+    from bigchaindb_smart_assets.assets import asset_cache
+    from bigchaindb_smart_assets.config import config
+    from bigchaindb_smart_assets.consensus import SmartAssetConsensusRules
+    from bigchaindb_smart_assets.expression import EvaluationContext
+
+    policy = [{'condition': "transaction.operation == 'TRANSFER'",
+               'rule': 'LEN(transaction.outputs) == 1'}]
+    assets = [create(asset_id, {'policy': policy})
+              for asset_id in ('a', 'b')]
+    bigchain = memory_bigchain(*assets)
+    asset_cache.clear()
+    transaction = SimpleNamespace(
+        operation='TRANSFER', asset={'id': 'a'}, outputs=[None],
+        inputs=[SimpleNamespace(owners_before=['alice'])] * 2,
+        get_asset_ids=lambda input_txs: [input_tx.id
+                                         for input_tx in input_txs])
+    input_txs = [(None, asset, 'valid') for asset in assets]
+
+    # enough steps for one of the two policies
+    context = EvaluationContext(transaction)
+    SmartAssetConsensusRules.evaluate_policy(
+        SmartAssetConsensusRules.resolve_asset_definitions(
+            bigchain, transaction, input_txs)[0].policy(),
+        transaction, context)
+    monkeypatch.setitem(config, 'policy_max_steps', context.steps)
+
+    assert SmartAssetConsensusRules.validate_asset(
+        bigchain, transaction, input_txs) is transaction
+
+
+def test_asset_state_is_read_from_the_spent_transactions():
+    import pytest
+    from bigchaindb.common.exceptions import ValidationError
+    from bigchaindb_smart_assets.assets import asset_cache
+    from bigchaindb_smart_assets.consensus import SmartAssetConsensusRules
+
+    policy = [{'condition': "transaction.operation == 'TRANSFER'",
+               'rule': "@state['state'] == 'ORDER'"}]
+    asset = create('a', {'policy': policy}, metadata={'state': 'INIT'})
+    order = SimpleNamespace(id='order', operation='TRANSFER',
+                            asset={'id': 'a'}, metadata={'state': 'ORDER'})
+    bigchain = memory_bigchain(asset)
+    asset_cache.clear()
+
+    def transfer(input_tx):
+        transaction = SimpleNamespace(
+            operation='TRANSFER', asset={'id': 'a'}, outputs=[None],
+            inputs=[SimpleNamespace(owners_before=['alice'])],
+            get_asset_ids=lambda input_txs: ['a'])
+        return transaction, [(None, input_tx, 'valid')]
+
+    # no index is enabled, the state is the one of the spent transaction
+    assert SmartAssetConsensusRules.asset_state_index is None
+    transaction, input_txs = transfer(order)
+    assert SmartAssetConsensusRules.validate_asset(
+        bigchain, transaction, input_txs) is transaction
+
+    transaction, input_txs = transfer(asset)
+    with pytest.raises(ValidationError):
+        SmartAssetConsensusRules.validate_asset(
+            bigchain, transaction, input_txs)
+
+
+def test_asset_reference_is_the_asset_of_the_create():
+    import pytest
+    from bigchaindb.common.exceptions import ValidationError
+    from bigchaindb_smart_assets.assets import asset_cache
+    from bigchaindb_smart_assets.consensus import SmartAssetConsensusRules
+
+    def transfer(owner):
+        policy = [{'condition': "transaction.operation == 'TRANSFER'",
+                   'rule': "@asset['data']['owner'] == '{}'".format(owner)}]
+        asset = create('a', {'owner': 'alice', 'policy': policy})
+        asset_cache.clear()
+        transaction = SimpleNamespace(
+            operation='TRANSFER', asset={'id': 'a'}, outputs=[None],
+            inputs=[SimpleNamespace(owners_before=['alice'])],
+            get_asset_ids=lambda input_txs: ['a'])
+        return SmartAssetConsensusRules.validate_asset(
+            memory_bigchain(asset), transaction, [(None, asset, 'valid')])
+
+    assert transfer('alice').operation == 'TRANSFER'
+    with pytest.raises(ValidationError) as excinfo:
+        transfer('nobody')
+    assert 'evaluated to false' in str(excinfo.value)
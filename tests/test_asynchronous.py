@@ -0,0 +1,55 @@
+import asyncio
+
+
+def test_validate_transactions_issues_lookups_concurrently(
+        workload_blocks, workload_bigchain, summary):
+    from bigchaindb_smart_assets.asynchronous import (
+        AsyncBackend, validate_transactions)
+    from bigchaindb_smart_assets.assets import asset_cache
+    from bigchaindb_smart_assets.consensus import SmartAssetConsensusRules
+    from bigchaindb_smart_assets.workload import replay
+
+    class AsyncMemoryBackend(AsyncBackend):
+        """A natively asynchronous backend, counting the lookups in
+        flight."""
+
+        def __init__(self, bigchain):
+            super().__init__(bigchain)
+            self.lookups = self.in_flight = self.peak = 0
+
+        async def get_transaction(self, transaction_id):
+            self.lookups += 1
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            await asyncio.sleep(0)
+            self.in_flight -= 1
+            return self.bigchain.get_transaction(transaction_id,
+                                                 include_status=True)
+
+    _, creates, transfers = workload_blocks
+    linking = [transaction for transaction in creates
+               if 'link' in transaction.asset['data']]
+    assert linking
+    bigchain = workload_bigchain
+
+    # every linking CREATE looks up its link target, then the first
+    # can_link entry; every TRANSFER its input, which is also its asset
+    for transactions, levels in ((creates, [len(linking)] * 2),
+                                 (transfers, [len(transfers)])):
+        asset_cache.clear()
+        backend = AsyncMemoryBackend(bigchain)
+        loop = asyncio.new_event_loop()
+        try:
+            results = loop.run_until_complete(
+                validate_transactions(backend, transactions))
+        finally:
+            loop.close()
+
+        assert summary(results) == summary(
+            SmartAssetConsensusRules.validate_transactions(
+                bigchain, transactions))
+        assert backend.lookups == sum(levels)
+        # the lookups of a level are all in flight at once
+        assert backend.peak == max(levels)
+
+        replay(bigchain, [transactions], SmartAssetConsensusRules)
@@ -0,0 +1,26 @@
+def test_bloom_filter_has_no_false_negatives():
+    from bigchaindb_smart_assets.bloom import BloomFilter
+
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add('tx{}'.format(i))
+
+    assert len(bloom) == 1000
+    assert all('tx{}'.format(i) in bloom for i in range(1000))
+    false_positives = sum('other{}'.format(i) in bloom for i in range(10000))
+    assert false_positives < 300
+
+    stats = bloom.stats()
+    assert stats['hashes'] == 7
+    assert stats['memory_bytes'] == (stats['bits'] + 7) // 8
+    assert 0.005 < stats['false_positive_rate'] < 0.02
+
+
+def test_bloom_filter_checks_its_sizing():
+    import pytest
+    from bigchaindb_smart_assets.bloom import BloomFilter
+
+    with pytest.raises(ValueError):
+        BloomFilter(capacity=0, error_rate=0.01)
+    with pytest.raises(ValueError):
+        BloomFilter(capacity=10, error_rate=1)
@@ -0,0 +1,42 @@
+def test_lru_cache_counts_hits_and_misses():
+    from bigchaindb_smart_assets.cache import LRUCache
+
+    cache = LRUCache(maxsize=2)
+    assert cache.get('a') is None
+    cache.put('a', 1)
+    assert cache.get('a') == 1
+
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['hit_rate'] == 0.5
+
+
+def test_lru_cache_evicts_least_recently_used():
+    from bigchaindb_smart_assets.cache import LRUCache
+
+    cache = LRUCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+
+    assert 'a' in cache
+    assert 'b' not in cache
+    assert 'c' in cache
+    assert cache.stats()['evictions'] == 1
+
+
+def test_lru_cache_get_or_create():
+    from bigchaindb_smart_assets.cache import LRUCache
+
+    calls = []
+
+    def factory(key):
+        calls.append(key)
+        return key.upper()
+
+    cache = LRUCache(maxsize=4)
+    assert cache.get_or_create('a', factory) == 'A'
+    assert cache.get_or_create('a', factory) == 'A'
+    assert calls == ['a']
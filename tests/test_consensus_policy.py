@@ -195,3 +195,39 @@ def test_consensus_rules_recipe(b):
     tx_mix_ready_signed = tx_mix_ready.sign([carly_priv])
     response = post_tx(b, None, tx_mix_ready_signed)
     assert response.status_code == 202
+
+
+@pytest.mark.bdb
+@pytest.mark.usefixtures('inputs')
+def test_consensus_validate_transactions(b):
+    from bigchaindb.common.exceptions import ValidationError
+    from bigchaindb_smart_assets.consensus import SmartAssetConsensusRules
+    from .utils import create_simple_tx, post_tx, transfer_simple_tx
+
+    alice_priv, alice_pub = crypto.generate_key_pair()
+    bruce_priv, bruce_pub = crypto.generate_key_pair()
+
+    create_a = create_simple_tx(
+        alice_pub, alice_priv,
+        asset={
+            'policy': [
+                {
+                    'condition': "transaction.operation == 'TRANSFER'",
+                    'rule': "transaction.metadata['state'] == 'SHIP'"
+                },
+            ]
+        })
+    response = post_tx(b, None, create_a)
+    assert response.status_code == 202
+
+    transfer_valid = transfer_simple_tx(
+        bruce_pub, alice_priv, create_a, metadata={'state': 'SHIP'})
+    transfer_invalid = transfer_simple_tx(
+        bruce_pub, alice_priv, create_a, metadata={'state': 'LOST'})
+
+    results = SmartAssetConsensusRules.validate_transactions(
+        b, [transfer_valid, transfer_invalid])
+
+    assert results[0] == (transfer_valid, None)
+    assert results[1][0] is None
+    assert isinstance(results[1][1], ValidationError)
@@ -0,0 +1,176 @@
+from types import SimpleNamespace
+
+
+def create(txid, owner, data=None):
+    return SimpleNamespace(
+        id=txid, operation='CREATE', asset={'data': data},
+        inputs=[SimpleNamespace(owners_before=[owner], fulfills=None)],
+        outputs=[SimpleNamespace(public_keys=[owner], amount=1)],
+        metadata=None)
+
+
+def transfer(txid, input_tx, owner, asset_id=None):
+    fulfills = SimpleNamespace(txid=input_tx.id, output=0)
+    return SimpleNamespace(
+        id=txid, operation='TRANSFER', asset={'id': asset_id or input_tx.id},
+        inputs=[SimpleNamespace(owners_before=input_tx.outputs[0].public_keys,
+                                fulfills=fulfills)],
+        outputs=[SimpleNamespace(public_keys=[owner], amount=1)],
+        metadata=None)
+
+
+def block(*transactions):
+    return SimpleNamespace(transactions=list(transactions))
+
+
+def test_owner_link_index_follows_transfers():
+    from bigchaindb_smart_assets.index import OwnerLinkIndex
+
+    role = create('role', 'admin', data={'link': 'permission'})
+    index = OwnerLinkIndex()
+    index.apply_block(block(create('permission', 'admin', data={}), role))
+
+    assert index.links('admin') == {'permission'}
+
+    role_to_alice = transfer('role_to_alice', role, 'alice')
+    index.apply_block(block(role_to_alice))
+
+    assert index.links('admin') == set()
+    assert index.holds_any('alice', ['other', 'permission'])
+    assert not index.holds_any('bob', ['permission'])
+
+    index.apply_block(block(transfer('role_to_bob', role_to_alice, 'bob',
+                                     asset_id='role')))
+
+    assert not index.holds_any('alice', ['permission'])
+    assert index.holds_any('bob', ['permission'])
+
+
+def test_link_target_index_pagination():
+    from bigchaindb_smart_assets.index import LinkTargetIndex
+
+    index = LinkTargetIndex()
+    index.apply_block(block(*[create('asset{}'.format(i), 'admin',
+                                     data={'link': 'permission'})
+                              for i in range(5)]))
+    index.apply_block(block(create('other', 'admin', data={'link': 'x'}),
+                            create('plain', 'admin', data={})))
+
+    assert index.count('permission') == 5
+    assert index.find('permission', limit=2) == (['asset0', 'asset1'], 2)
+    assert index.find('permission', offset=4, limit=2) == (['asset4'], None)
+    assert index.find('unknown') == ([], None)
+
+
+def test_asset_state_index_projects_the_latest_state():
+    from bigchaindb_smart_assets.index import AssetStateIndex
+
+    index = AssetStateIndex(keys=['state', 'holder'])
+    order = create('order', 'alice')
+    order.metadata = {'state': 'INIT'}
+    other = create('other', 'alice')
+    other.metadata = {'state': 'INIT', 'holder': ['not', 'hashable']}
+    index.apply_block(block(order, other, create('plain', 'alice')))
+
+    assert index.state('order') == {'state': 'INIT'}
+    assert index.state('plain') == {}
+    assert index.find('INIT') == (['order', 'other'], None)
+
+    shipped = transfer('shipped', order, 'bob')
+    shipped.metadata = {'state': 'SHIPPED', 'holder': 'bob'}
+    index.apply_block(block(shipped, transfer('moved', other, 'bob')))
+
+    assert index.state('order') == {'state': 'SHIPPED', 'holder': 'bob'}
+    assert index.state('other') == {'state': 'INIT'}
+    assert index.find('INIT') == (['other'], None)
+    assert index.find('bob', key='holder') == (['order'], None)
+    assert index.count('SHIPPED') == 1
+
+
+def test_transaction_id_filter():
+    from bigchaindb_smart_assets.index import TransactionIdFilter
+
+    index = TransactionIdFilter(capacity=100, error_rate=0.001)
+    permission = create('permission', 'admin', data={})
+    index.apply_block(block(permission, transfer('moved', permission, 'bob')))
+
+    assert index.might_contain('permission')
+    assert index.might_contain('moved')
+    assert not index.might_contain('unknown')
+    assert not index.might_contain(['not', 'a', 'string'])
+
+    stats = index.stats()
+    assert stats['items'] == 2
+    assert stats['queries'] == 4
+    assert stats['negatives'] == 2
+
+
+def test_owner_link_index_is_a_shortcut_for_can_link(monkeypatch):
+    import pytest
+    from bigchaindb.common.exceptions import ValidationError
+    from bigchaindb_smart_assets.consensus import SmartAssetConsensusRules
+    from bigchaindb_smart_assets.index import OwnerLinkIndex
+    from bigchaindb_smart_assets.memory import MemoryBigchain
+
+    monkeypatch.setattr(SmartAssetConsensusRules, 'owner_link_index',
+                        OwnerLinkIndex())
+    bigchain = MemoryBigchain(consensus_plugin=SmartAssetConsensusRules)
+    bigchain.commit_transactions(
+        [create('alice_role', 'alice', data={'link': 'permission'})])
+    # not voted on yet, so unknown to the index
+    bigchain.write_block(SimpleNamespace(
+        id='undecided',
+        transactions=[create('bob_role', 'bob', data={'link': 'permission'})]))
+    wallets = []
+    get_owned_ids = bigchain.get_owned_ids
+    monkeypatch.setattr(
+        bigchain, 'get_owned_ids',
+        lambda public_key: wallets.append(public_key) or
+        get_owned_ids(public_key))
+
+    for public_key in ('alice', 'bob'):
+        SmartAssetConsensusRules.validate_can_link(
+            bigchain, ['permission'], public_key)
+    with pytest.raises(ValidationError):
+        SmartAssetConsensusRules.validate_can_link(
+            bigchain, ['permission'], 'carol')
+
+    # the wallet of alice is not scanned, the index finds her permission
+    assert wallets == ['bob', 'carol']
+
+
+def test_transaction_id_filter_negatives_are_confirmed(monkeypatch):
+    import pytest
+    from bigchaindb.common.exceptions import ValidationError
+    from bigchaindb_smart_assets.consensus import SmartAssetConsensusRules
+    from bigchaindb_smart_assets.index import TransactionIdFilter
+    from bigchaindb_smart_assets.memory import MemoryBigchain
+
+    role_target = create('role_target', 'admin', data={})
+    by_role = create('by_role', 'admin', data={})
+    by_role.metadata = {'can_link': ['role_target']}
+    by_key = create('by_key', 'admin', data={})
+    by_key.metadata = {'can_link': ['bob', 'alice']}
+    # the bigchain has no consensus plugin to feed the filter, which is
+    # empty as after a restart
+    bigchain = MemoryBigchain()
+    bigchain.commit_transactions([
+        role_target, by_role, by_key,
+        create('role', 'alice', data={'link': 'role_target'})])
+    transaction_id_filter = TransactionIdFilter(capacity=100,
+                                                error_rate=0.001)
+    monkeypatch.setattr(SmartAssetConsensusRules, 'transaction_id_filter',
+                        transaction_id_filter)
+
+    for target in ('by_role', 'by_key'):
+        SmartAssetConsensusRules.validate_link(
+            create('linking', 'alice', data={'link': target}), bigchain)
+    for target in ('by_role', 'by_key', 'unknown'):
+        with pytest.raises(ValidationError):
+            SmartAssetConsensusRules.validate_link(
+                create('linking', 'carol', data={'link': target}), bigchain)
+
+    # the first entry of every can_link was checked against the filter,
+    # which did not know about 'role_target' either
+    stats = transaction_id_filter.stats()
+    assert stats['queries'] == stats['negatives'] == 4
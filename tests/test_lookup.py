@@ -0,0 +1,46 @@
+class FakeBigchain():
+    def __init__(self, transactions):
+        self.transactions = transactions
+        self.calls = 0
+
+    def get_transaction(self, transaction_id, include_status=False):
+        self.calls += 1
+        transaction = self.transactions.get(transaction_id)
+        if include_status:
+            return transaction, 'valid' if transaction else None
+        return transaction
+
+
+def test_lookup_context_memoizes_transactions():
+    from bigchaindb_smart_assets.lookup import LookupContext
+
+    bigchain = FakeBigchain({'a': 'tx_a'})
+    context = LookupContext(bigchain)
+
+    assert context.get_transaction('a') == 'tx_a'
+    assert context.get_transaction('a', include_status=True) == \
+        ('tx_a', 'valid')
+    assert context.get_transaction('b') is None
+    assert context.get_transaction('b') is None
+
+    assert bigchain.calls == 2
+    assert context.stats()['hits'] == 2
+    assert context.stats()['round_trips'] == 2
+
+
+def test_lookup_context_prefetch_uses_bulk_lookup():
+    from bigchaindb_smart_assets.lookup import LookupContext
+
+    class BulkBigchain(FakeBigchain):
+        def get_transactions(self, transaction_ids, include_status=False):
+            self.calls += 1
+            return [(self.transactions.get(transaction_id), 'valid')
+                    for transaction_id in transaction_ids]
+
+    bigchain = BulkBigchain({'a': 'tx_a', 'b': 'tx_b'})
+    context = LookupContext(bigchain)
+    context.prefetch_transactions(['a', 'b', 'c'])
+
+    assert context.get_transaction('a') == 'tx_a'
+    assert context.get_transaction('b') == 'tx_b'
+    assert bigchain.calls == 1
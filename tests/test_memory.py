@@ -0,0 +1,77 @@
+def test_memory_bigchain_replays_workload():
+    from bigchaindb_smart_assets.consensus import SmartAssetConsensusRules
+    from bigchaindb_smart_assets.memory import MemoryBigchain
+    from bigchaindb_smart_assets.workload import Workload, replay
+
+    workload = Workload(assets=20, transfers=2, keys=5, block_size=10,
+                        seed=1)
+    bigchain = MemoryBigchain(consensus_plugin=SmartAssetConsensusRules)
+    stats = replay(bigchain, workload.blocks(), SmartAssetConsensusRules)
+
+    assert stats['valid'] == len(workload)
+    assert stats['invalid'] == 0
+
+
+def test_memory_bigchain_tracks_outputs(alice, bob):
+    from bigchaindb.models import Transaction
+    from bigchaindb_smart_assets.consensus import SmartAssetConsensusRules
+    from bigchaindb_smart_assets.memory import MemoryBigchain
+
+    bigchain = MemoryBigchain(consensus_plugin=SmartAssetConsensusRules)
+    create = Transaction.create(
+        [alice.public_key], [([alice.public_key], 1)]
+    ).sign([alice.private_key])
+    transfer = Transaction.transfer(
+        create.to_inputs(), [([bob.public_key], 1)], asset_id=create.id
+    ).sign([alice.private_key])
+
+    for transaction, decision in ((create, True), (transfer, False)):
+        block = bigchain.create_block([transaction])
+        bigchain.write_block(block)
+        bigchain.write_vote(bigchain.vote(
+            block.id, bigchain.get_last_voted_block().id, decision))
+
+    assert bigchain.get_transaction(create.id, include_status=True) == \
+        (create, bigchain.TX_VALID)
+    assert [link.txid for link in bigchain.get_owned_ids(alice.public_key)] \
+        == [create.id]
+    assert bigchain.get_owned_ids(bob.public_key) == []
+    assert bigchain.get_spent(create.id, 0) is None
+    assert bigchain.get_transaction(transfer.id, include_status=True) == \
+        (None, None)
+
+    bigchain.write_transaction(transfer)
+    assert bigchain.get_transaction(transfer.id, include_status=True) == \
+        (transfer, bigchain.TX_IN_BACKLOG)
+
+
+def test_transaction_id_filter_knows_undecided_transactions():
+    from bigchaindb_smart_assets.assets import asset_cache
+    from bigchaindb_smart_assets.consensus import SmartAssetConsensusRules
+    from bigchaindb_smart_assets.index import TransactionIdFilter
+    from bigchaindb_smart_assets.memory import MemoryBigchain
+    from bigchaindb_smart_assets.workload import Workload
+
+    workload = Workload(assets=2, transfers=0, link_ratio=1, keys=2,
+                        block_size=2, seed=1)
+    [permission], creates = workload.blocks()
+
+    # the link target is in the backlog, or in a block not voted on yet
+    for write in ('transaction', 'block'):
+        asset_cache.clear()
+        bigchain = MemoryBigchain(consensus_plugin=SmartAssetConsensusRules)
+        SmartAssetConsensusRules.transaction_id_filter = TransactionIdFilter(
+            capacity=100, error_rate=0.001)
+        try:
+            if write == 'transaction':
+                bigchain.write_transaction(permission)
+            else:
+                bigchain.write_block(bigchain.create_block([permission]))
+            results = SmartAssetConsensusRules.validate_transactions(
+                bigchain, creates)
+        finally:
+            SmartAssetConsensusRules.transaction_id_filter = None
+
+        assert [error for _, error in results] == [None, None]
+        assert [result.id for result, _ in results] == \
+            [create.id for create in creates]
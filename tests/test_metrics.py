@@ -0,0 +1,28 @@
+def test_null_metrics_timer_is_shared():
+    from bigchaindb_smart_assets.metrics import NullMetrics
+
+    metrics = NullMetrics()
+    with metrics.timer('validate_policy', 'TRANSFER') as timer:
+        pass
+
+    assert timer is metrics.timer('validate_link', 'CREATE')
+
+
+def test_metrics_render_prometheus():
+    from bigchaindb_smart_assets.metrics import Metrics
+
+    metrics = Metrics(buckets=(0.1, float('inf')))
+    metrics.observe('validate_policy', 'TRANSFER', 0.05)
+    metrics.observe('validate_policy', 'TRANSFER', 0.5)
+    metrics.increment('backend_lookups', 'TRANSFER', 3)
+
+    lines = metrics.render_prometheus(prefix='sa').splitlines()
+
+    assert '# TYPE sa_stage_duration_seconds histogram' in lines
+    assert 'sa_stage_duration_seconds_bucket{stage="validate_policy",' \
+        'operation="TRANSFER",le="0.1"} 1' in lines
+    assert 'sa_stage_duration_seconds_bucket{stage="validate_policy",' \
+        'operation="TRANSFER",le="+Inf"} 2' in lines
+    assert 'sa_stage_duration_seconds_count{stage="validate_policy",' \
+        'operation="TRANSFER"} 2' in lines
+    assert 'sa_backend_lookups_total{operation="TRANSFER"} 3' in lines
@@ -0,0 +1,84 @@
+from types import SimpleNamespace
+
+import pytest
+
+
+def test_partition_keeps_assets_together_and_in_order():
+    from bigchaindb_smart_assets.parallel import partition
+
+    transactions = [
+        SimpleNamespace(id='a', operation='CREATE', asset={'data': None}),
+        SimpleNamespace(id='b', operation='CREATE', asset={'data': None}),
+        SimpleNamespace(id='c', operation='TRANSFER', asset={'id': 'a'}),
+        SimpleNamespace(id='d', operation='TRANSFER', asset={'id': 'b'}),
+        SimpleNamespace(id='e', operation='TRANSFER', asset={'id': 'a'}),
+    ]
+
+    partitions = partition(transactions, 3)
+
+    assert len(partitions) == 3
+    assert sorted(sum(partitions, [])) == list(range(5))
+    assert [0, 2, 4] in partitions
+    assert [1, 3] in partitions
+    assert partition(transactions, 3) == partitions
+
+
+@pytest.mark.bdb
+@pytest.mark.genesis
+def test_parallel_validator_matches_serial_validation(
+        b, alice, workload_blocks, summary):
+    from bigchaindb import Bigchain
+    from bigchaindb.models import Transaction
+    from bigchaindb_smart_assets.consensus import SmartAssetConsensusRules
+    from bigchaindb_smart_assets.parallel import ParallelValidator
+    from bigchaindb_smart_assets.workload import replay
+
+    permission, creates, transfers = workload_blocks
+    unauthorized = Transaction.create(
+        [alice.public_key], [([alice.public_key], 1)],
+        asset={'data': {'link': permission[0].id}},
+    ).sign([alice.private_key])
+
+    blocks = (permission, creates + [unauthorized], transfers)
+    with ParallelValidator(Bigchain, processes=3) as validator:
+        results = []
+        for transactions in blocks:
+            results.append(validator.validate_transactions(transactions))
+            assert summary(results[-1]) == summary(
+                SmartAssetConsensusRules.validate_transactions(
+                    b, transactions))
+            replay(b, [transactions], SmartAssetConsensusRules)
+
+    valid = [result for block_results in results
+             for result, error in block_results if error is None]
+    assert valid == permission + creates + transfers
+    assert 'Linking is not authorized' in str(results[1][-1][1])
+
+
+def asset_state(asset_id):
+    from bigchaindb_smart_assets.consensus import SmartAssetConsensusRules
+    return SmartAssetConsensusRules.asset_state_index.state(asset_id)
+
+
+def test_parallel_validator_commits_blocks_to_workers(alice):
+    from bigchaindb.models import Transaction
+    from bigchaindb_smart_assets.consensus import SmartAssetConsensusRules
+    from bigchaindb_smart_assets.index import AssetStateIndex
+    from bigchaindb_smart_assets.memory import MemoryBigchain
+    from bigchaindb_smart_assets.parallel import ParallelValidator
+
+    create = Transaction.create(
+        [alice.public_key], [([alice.public_key], 1)],
+        metadata={'state': 'INIT'},
+    ).sign([alice.private_key])
+
+    SmartAssetConsensusRules.asset_state_index = AssetStateIndex()
+    try:
+        with ParallelValidator(MemoryBigchain, processes=2) as validator:
+            validator.commit_block(SimpleNamespace(transactions=[create]))
+            states = [worker.apply(asset_state, (create.id,))
+                      for worker in validator.workers]
+    finally:
+        SmartAssetConsensusRules.asset_state_index = None
+
+    assert states == [{'state': 'INIT'}, {'state': 'INIT'}]
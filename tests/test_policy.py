@@ -82,3 +82,287 @@ def test_policy_grammar_transaction(b, user_pk):
         parser = PolicyParser(transaction=transaction)
         result = parser.parse(test_input[0], lexer=parser.lexer)
         assert result == test_input[1]
+
+
+def test_compiled_expression_is_cached():
+    from bigchaindb_smart_assets.policy import compile_expression, policy_cache
+
+    policy_cache.clear()
+    compiled = compile_expression('SUM([1, 2, 3]) == 6')
+
+    assert compile_expression('SUM([1, 2, 3]) == 6') is compiled
+    assert compiled.evaluate(None) is True
+    assert policy_cache.stats()['hits'] >= 1
+
+
+def test_policy_compile_ast():
+    from bigchaindb_smart_assets.expression import (
+        BinaryOperation, Constant, TransactionPath)
+
+    parser = PolicyParser()
+    ast = parser.compile('transaction.operation == "CREATE"',
+                         lexer=parser.lexer)
+
+    assert ast == BinaryOperation('==',
+                                  TransactionPath('transaction.operation'),
+                                  Constant('CREATE'))
+
+
+def test_compiled_expression_binds_any_transaction():
+    from types import SimpleNamespace
+    from bigchaindb_smart_assets.policy import compile_expression
+
+    compiled = compile_expression('transaction.operation == "CREATE"')
+
+    assert compiled.evaluate(SimpleNamespace(operation='CREATE')) is True
+    assert compiled.evaluate(SimpleNamespace(operation='TRANSFER')) is False
+
+
+def test_parse_transaction_path():
+    from bigchaindb_smart_assets.expression import parse_path
+
+    assert parse_path('transaction.outputs[0].public_keys[0]') == (
+        ('attribute', 'outputs'), ('index', 0),
+        ('attribute', 'public_keys'), ('index', 0))
+    assert parse_path("transaction.metadata['state']") == (
+        ('attribute', 'metadata'), ('key', 'state'))
+    assert parse_path('transaction.__class__') is None
+    assert parse_path('transaction.metadata[state]') is None
+
+
+def test_transaction_path_resolution_is_memoized():
+    from types import SimpleNamespace
+    from bigchaindb_smart_assets.expression import (
+        EvaluationContext, TransactionPath)
+
+    path = TransactionPath("transaction.metadata['state']")
+    transaction = SimpleNamespace(metadata={'state': 'INIT'})
+    context = EvaluationContext(transaction)
+
+    assert path.evaluate(context) == 'INIT'
+    transaction.metadata['state'] = 'DONE'
+    assert path.evaluate(context) == 'INIT'
+    assert TransactionPath('transaction.__class__').evaluate(context) == \
+        'transaction.__class__'
+
+
+def test_boolean_operators_short_circuit():
+    from types import SimpleNamespace
+    from bigchaindb_smart_assets.expression import EvaluationContext
+    from bigchaindb_smart_assets.policy import compile_expression
+
+    # the right operand would raise a TypeError if it was evaluated
+    transaction = SimpleNamespace(operation='CREATE', outputs=None)
+    test_inputs = [
+        ("transaction.operation == 'CREATE' OR AMOUNT(transaction.outputs) > 5",
+         True),
+        ("transaction.operation == 'TRANSFER' AND AMOUNT(transaction.outputs) > 5",
+         False),
+    ]
+
+    for expression, expected in test_inputs:
+        context = EvaluationContext(transaction)
+        result = compile_expression(expression).evaluate(transaction, context)
+        assert result is expected
+        assert 'transaction.outputs' not in context.values
+
+
+def test_check_expression():
+    from bigchaindb_smart_assets.policy import (
+        PolicyError, check_expression, compile_expression)
+
+    valid = [
+        "transaction.metadata['state'] == 'INIT'",
+        "@asset['data']['owner'] == 'alice'",
+        'AMOUNT(transaction.outputs) == 1',
+        'LEN(2, 2) == 2',
+        '1 / (2 - 1) == 1',
+        '1 / (SUM([1]) - 1) == 1',
+        "3 * (4 + 5 * 6) > 100 AND ('TEST' == 'TEST' OR 'DUMMY' == 'TEST')",
+    ]
+    invalid = [
+        ('1 +', 'Syntax error'),
+        ('1 $ 2', 'Illegal character'),
+        ("'a' < 1", 'not supported'),
+        ("SUM([1, 'a']) > 0", 'unsupported operand'),
+        ('AMOUNT(3) == 3', 'AMOUNT takes'),
+        ('LEN(transactions.outputs) == 1', 'Invalid transaction path'),
+        ('transaction.signature == 1', 'Unknown transaction attribute'),
+        ('1 / 0 == 1', 'Division by zero'),
+        ("@asset.data['owner'] == 'alice'", 'Invalid reference'),
+        ('transaction.metadata["a"] / (2 - 2) == 1', 'Division by zero'),
+    ]
+
+    for expression in valid:
+        compiled = compile_expression(expression)
+        check_expression(compiled)
+        assert compiled.checked
+
+    for expression, message in invalid:
+        with pytest.raises(PolicyError) as excinfo:
+            check_expression(compile_expression(expression))
+        assert message in str(excinfo.value)
+
+
+def test_check_policy():
+    from bigchaindb_smart_assets.policy import PolicyError, check_policy
+
+    policy = [{'condition': "transaction.operation == 'TRANSFER'",
+               'rule': 'LEN(transaction.outputs) == 1'}]
+    assert [rule for rule, _, _ in check_policy(policy)] == policy
+
+    for policy in ({}, [{'rule': '1 == 1'}], [{'condition': 1, 'rule': '1'}],
+                   [{'condition': '1 == 1', 'rule': '(1'}]):
+        with pytest.raises(PolicyError):
+            check_policy(policy)
+
+
+def test_compiled_expression_cost():
+    from bigchaindb_smart_assets.policy import compile_expression, policy_cost
+
+    # ==(SUM(List(1, 2, 3)), 6)
+    compiled = compile_expression('SUM([1, 2, 3]) == 6')
+    assert compiled.cost == 7
+    assert policy_cost([(None, compiled, compiled)]) == 14
+
+
+def test_policy_limits():
+    from types import SimpleNamespace
+    from bigchaindb_smart_assets.config import config
+    from bigchaindb_smart_assets.expression import (
+        EvaluationContext, LimitExceeded)
+    from bigchaindb_smart_assets.policy import (
+        PolicyError, compile_expression, compile_policy)
+
+    rule = {'condition': '1 == 1', 'rule': 'LEN(transaction.outputs) > 0'}
+    with pytest.raises(PolicyError):
+        compile_policy([rule] * (config['policy_max_rules'] + 1))
+    with pytest.raises(PolicyError):
+        compile_policy([{'condition': ' + '.join(['1'] * 300),
+                         'rule': '1 == 1'}])
+
+    compiled = compile_expression(rule['rule'])
+    transaction = SimpleNamespace(outputs=list(range(10)))
+    assert compiled.evaluate(
+        transaction, EvaluationContext(transaction, max_steps=15)) is True
+    with pytest.raises(LimitExceeded):
+        compiled.evaluate(
+            transaction, EvaluationContext(transaction, max_steps=10))
+    with pytest.raises(LimitExceeded):
+        compiled.evaluate(
+            transaction, EvaluationContext(transaction, max_list_length=5))
+
+
+def test_parsers_share_tables():
+    first, second = PolicyParser(), PolicyParser()
+
+    assert first.parser is not second.parser
+    assert first.parser.action is second.parser.action
+    assert first.lexer is not second.lexer
+
+    first.compile('1 +', lexer=first.lexer)
+    second.compile('1 + 1', lexer=second.lexer)
+    assert first.errors and not second.errors
+
+
+def test_write_tables():
+    import os
+    import tempfile
+    from bigchaindb_smart_assets.policy import write_tables
+
+    with tempfile.TemporaryDirectory() as outputdir:
+        write_tables(outputdir)
+        assert os.listdir(outputdir) == ['policy_parsetab.py']
+
+
+def test_column_aggregates():
+    from array import array
+    from types import SimpleNamespace
+    from bigchaindb_smart_assets.expression import EvaluationContext
+    from bigchaindb_smart_assets.policy import compile_expression
+
+    transaction = SimpleNamespace(outputs=[
+        SimpleNamespace(amount=2, public_keys=['alice']),
+        SimpleNamespace(amount=3, public_keys=['bob', 'alice']),
+    ])
+    test_inputs = [
+        ('SUM(transaction.outputs[*].amount)', 5),
+        ('MIN(transaction.outputs[*].amount)', 2),
+        ('MAX(transaction.outputs[*].amount, 4)', 4),
+        ('LEN(transaction.outputs[*].public_keys[*])', 3),
+        ('DISTINCT(transaction.outputs[*].public_keys[*])', 2),
+        ("COUNT_IF(transaction.outputs[*].public_keys[*], 'alice')", 2),
+        ('COUNT_IF([1, 2, 1], 1)', 2),
+        ('LEN([1, 2], 3)', 3),
+    ]
+
+    context = EvaluationContext(transaction)
+    for expression, expected in test_inputs:
+        assert compile_expression(expression).evaluate(
+            transaction, context) == expected
+
+    # columns are extracted once per evaluation context
+    assert context.values['transaction.outputs[*].amount'] == \
+        array('q', [2, 3])
+    assert context.values['transaction.outputs[*].public_keys[*]'] == \
+        ['alice', 'bob', 'alice']
+
+
+def test_membership():
+    from types import SimpleNamespace
+    from bigchaindb_smart_assets.expression import Constant, Membership
+    from bigchaindb_smart_assets.policy import compile_expression
+
+    transaction = SimpleNamespace(
+        operation='TRANSFER', metadata={'key': 'bob'},
+        outputs=[SimpleNamespace(public_keys=['alice', 'carly'])])
+    test_inputs = [
+        ("transaction.metadata['key'] IN {'alice', 'bob'}", True),
+        ("transaction.metadata['key'] NOT IN {'alice', 'bob'}", False),
+        ("'carly' IN transaction.outputs[*].public_keys[*]"
+         " AND transaction.operation == 'TRANSFER'", True),
+        ("transaction.metadata['key'] IN {transaction.operation, 'carly'}",
+         False),
+        ('3 NOT IN {1, 2} OR 1 == 2', True),
+    ]
+
+    for expression, expected in test_inputs:
+        assert compile_expression(expression).evaluate(transaction) is \
+            expected
+
+    compiled = compile_expression("'bob' IN {'alice', 'bob'}")
+    assert compiled.ast == Membership(False, Constant('bob'),
+                                      Constant(frozenset(['alice', 'bob'])))
+
+
+def test_references():
+    from types import SimpleNamespace
+    from bigchaindb_smart_assets.expression import EvaluationContext
+    from bigchaindb_smart_assets.policy import (
+        compile_expression, compile_policy, policy_references)
+
+    rule = ("@inputs[0].metadata['state'] == 'ORDER'"
+            " AND @asset['data']['owner'] == 'alice'")
+    policy = [{'condition': "transaction.operation == 'TRANSFER'",
+               'rule': rule}]
+    assert policy_references(compile_policy(policy)) == \
+        {('inputs', 0), ('asset', None)}
+
+    transaction = SimpleNamespace(operation='TRANSFER')
+    context = EvaluationContext(transaction)
+    context.bind([SimpleNamespace(metadata={'state': 'ORDER'})],
+                 {'data': {'owner': 'alice'}})
+    assert compile_expression(rule).evaluate(transaction, context) is True
+
+    # unresolved references evaluate to their source text
+    context.bind((), None)
+    assert compile_expression('@inputs[1].id').evaluate(
+        transaction, context) == '@inputs[1].id'
+    context.bind((), {'data': None})
+    assert compile_expression("@asset['data']['owner']").evaluate(
+        transaction, context) == "@asset['data']['owner']"
+
+    state = compile_expression("@state['state'] == 'SHIPPED'")
+    assert state.references == {('state', None)}
+    context.bind((), None, {'state': 'SHIPPED'})
+    assert state.evaluate(transaction, context) is True
@@ -0,0 +1,64 @@
+class CountingBigchain():
+    """Counts the transaction lookups made through it."""
+
+    def __init__(self, bigchain):
+        self.bigchain = bigchain
+        self.round_trips = 0
+
+    def __getattr__(self, name):
+        return getattr(self.bigchain, name)
+
+    def get_transaction(self, transaction_id, include_status=False):
+        self.round_trips += 1
+        return self.bigchain.get_transaction(transaction_id, include_status)
+
+    def get_transactions(self, transaction_ids, include_status=False):
+        self.round_trips += 1
+        return self.bigchain.get_transactions(transaction_ids,
+                                              include_status)
+
+
+def test_windows():
+    from bigchaindb_smart_assets.streaming import windows
+
+    assert list(windows(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(windows([], 2)) == []
+
+
+def test_validate_stream_prefetches_one_window_ahead(
+        workload_blocks, workload_bigchain, summary):
+    from bigchaindb_smart_assets.assets import asset_cache
+    from bigchaindb_smart_assets.consensus import SmartAssetConsensusRules
+    from bigchaindb_smart_assets.streaming import validate_stream
+    from bigchaindb_smart_assets.workload import replay
+
+    _, creates, transfers = workload_blocks
+    bigchain = workload_bigchain
+
+    for transactions in (creates, transfers):
+        asset_cache.clear()
+        counting = CountingBigchain(bigchain)
+        consumed = []
+
+        def incoming():
+            for transaction in transactions:
+                consumed.append(transaction)
+                yield transaction
+
+        stream = validate_stream(counting, incoming(), window=3)
+        results = [next(stream)]
+        # the second window was read, and its lookups issued, before the
+        # first one was validated
+        assert len(consumed) == 6
+        results.extend(stream)
+
+        assert [transaction for transaction, _ in results] == transactions
+        assert summary(result for _, result in results) == summary(
+            SmartAssetConsensusRules.validate_transactions(
+                bigchain, transactions))
+        # bulk lookups only, at most one per level of dependencies that
+        # looks up transactions (inputs and links, assets and can_link
+        # entries, wallet transactions, their assets) and window
+        assert counting.round_trips <= 4 * 3
+
+        replay(bigchain, [transactions], SmartAssetConsensusRules)
@@ -0,0 +1,55 @@
+import logging
+from types import SimpleNamespace
+
+
+class RecordingHandler(logging.Handler):
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def make_tracer():
+    from bigchaindb_smart_assets.tracing import Tracer
+
+    logger = logging.getLogger('tests.tracing')
+    logger.setLevel(logging.INFO)
+    handler = RecordingHandler()
+    logger.handlers = [handler]
+    logger.propagate = False
+    return Tracer(logger), handler
+
+
+def test_untraced_transaction_records_nothing():
+    from bigchaindb_smart_assets.tracing import event
+
+    tracer, handler = make_tracer()
+    transaction = SimpleNamespace(id='a', operation='CREATE', asset={})
+
+    assert tracer.begin(transaction) is None
+    event('link', 'target')
+    assert handler.records == []
+
+
+def test_traced_transaction_logs_one_record():
+    from bigchaindb_smart_assets.tracing import event
+
+    tracer, handler = make_tracer()
+    tracer.trace_asset('asset')
+    transaction = SimpleNamespace(id='b', operation='TRANSFER',
+                                  asset={'id': 'asset'})
+
+    trace = tracer.begin(transaction)
+    event('link', 'target')
+    event('tx_id_check', 'target', True)
+    tracer.end(trace, ValueError('boom'))
+    event('link', 'ignored')
+
+    assert len(handler.records) == 1
+    message = handler.records[0].getMessage()
+    assert 'tx=b operation=TRANSFER asset=asset' in message
+    assert "result=invalid(ValueError('boom'))" in message
+    assert 'events=[link(target) tx_id_check(target,True)]' in message